@@ -1,25 +1,151 @@
+import shelve
+import sys
+from collections import OrderedDict
+
+# Level that holds per-merchant information managed by the advance routine
+MERCHANT_INFO_LEVEL = 'merchant_info'
+
+# Merchant id used for level-wide tables added with add_table()
+LEVEL_TABLE = None
+
+
 class MELevelTables:
-    def __init__(self):
-        self.tables = {}
+    """
+    Per-ME working tables keyed by (level, merchant_id).
 
-    def add_table(self, level, data):
-        self.tables[level] = data
+    Entries live in an LRU-ordered dict bounded by max_entries and/or max_bytes
+    (shallow sizes via sys.getsizeof). Least recently used entries are evicted
+    when a budget is exceeded, or spilled to a shelve file at spill_path and
+    reloaded on demand. A level index and a merchant-id index keep
+    reset_level() and merchant lookups proportional to the entries involved.
+    """
 
-    def get_table(self, level):
-        return self.tables.get(level, None)
+    def __init__(self, max_entries=None, max_bytes=None, spill_path=None, sizeof=sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.tables = OrderedDict()      # (level, merchant_id) -> data, in LRU order
+        self.sizes = {}                  # (level, merchant_id) -> estimated bytes
+        self.total_bytes = 0
+        self.level_index = {}            # level -> set of merchant ids (resident or spilled)
+        self.merchant_index = {}         # merchant_id -> set of levels
+        self.spill_store = shelve.open(spill_path, flag='n') if spill_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+
+    def add_table(self, level, data, merchant_id=LEVEL_TABLE):
+        key = (level, merchant_id)
+        if key in self.tables:
+            self._discard_resident(key)
+        elif self.spill_store is not None:
+            self.spill_store.pop(self._spill_key(key), None)
+        self.tables[key] = data
+        # A rewritten entry is the most recently used, not kept in its old place
+        self.tables.move_to_end(key)
+        self.sizes[key] = self.sizeof(data)
+        self.total_bytes += self.sizes[key]
+        self.level_index.setdefault(level, set()).add(merchant_id)
+        self.merchant_index.setdefault(merchant_id, set()).add(level)
+        self._enforce_budget()
+
+    def get_table(self, level, merchant_id=LEVEL_TABLE):
+        key = (level, merchant_id)
+        data = self.tables.get(key)
+        if data is not None:
+            self.tables.move_to_end(key)
+            self.hits += 1
+            return data
+        self.misses += 1
+        if self.spill_store is not None and merchant_id in self.level_index.get(level, ()):
+            data = self.spill_store.pop(self._spill_key(key), None)
+            if data is not None:
+                self.add_table(level, data, merchant_id)
+        return data
+
+    def merchant_levels(self, merchant_id):
+        return set(self.merchant_index.get(merchant_id, ()))
 
     def reset_level(self, level):
-        if level in self.tables:
-            del self.tables[level]
+        # Bulk-clear via the level index: touches only this level's entries
+        for merchant_id in self.level_index.pop(level, ()):
+            key = (level, merchant_id)
+            if key in self.tables:
+                self._discard_resident(key)
+                del self.tables[key]
+            elif self.spill_store is not None:
+                self.spill_store.pop(self._spill_key(key), None)
+            levels = self.merchant_index.get(merchant_id)
+            if levels is not None:
+                levels.discard(level)
+                if not levels:
+                    del self.merchant_index[merchant_id]
+
+    def stats(self):
+        return {'entries': len(self.tables), 'bytes': self.total_bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'spills': self.spills}
+
+    def close(self):
+        if self.spill_store is not None:
+            self.spill_store.close()
+            self.spill_store = None
+
+    def _discard_resident(self, key):
+        self.total_bytes -= self.sizes.pop(key)
+
+    def _over_budget(self):
+        return ((self.max_entries is not None and len(self.tables) > self.max_entries)
+                or (self.max_bytes is not None and self.total_bytes > self.max_bytes))
+
+    def _enforce_budget(self):
+        # Keep at least the entry just added resident
+        while len(self.tables) > 1 and self._over_budget():
+            key, data = self.tables.popitem(last=False)
+            self._discard_resident(key)
+            self.evictions += 1
+            if self.spill_store is not None:
+                self.spill_store[self._spill_key(key)] = data
+                self.spills += 1
+            else:
+                self._unindex(key)
+
+    def _unindex(self, key):
+        level, merchant_id = key
+        self.level_index[level].discard(merchant_id)
+        if not self.level_index[level]:
+            del self.level_index[level]
+        self.merchant_index[merchant_id].discard(level)
+        if not self.merchant_index[merchant_id]:
+            del self.merchant_index[merchant_id]
+
+    @staticmethod
+    def _spill_key(key):
+        return repr(key)
 
 
 class BeelineAdvanceRoutine:
-    def __init__(self):
-        self.me_level_tables = MELevelTables()
+    def __init__(self, me_level_tables=None, mm77_lookup=None):
+        self.me_level_tables = me_level_tables if me_level_tables is not None else MELevelTables()
+        # Keyed MM77 master lookup (e.g. mm77_lookup.MM77LookupStore)
+        self.mm77_lookup = mm77_lookup
 
     def manage_merchant_info(self, merchant_id, details):
-        # Logic to manage merchant information
-        pass
+        # Merge the new details into the merchant's working information
+        info = dict(self.get_merchant_info(merchant_id) or {})
+        info.update(details)
+        self.me_level_tables.add_table(MERCHANT_INFO_LEVEL, info, merchant_id)
+        return info
+
+    def get_merchant_info(self, merchant_id):
+        return self.me_level_tables.get_table(MERCHANT_INFO_LEVEL, merchant_id)
+
+    def merchant_master(self, merchant_id):
+        # MM77 attributes of the merchant, or None if it is not in the master file
+        if self.mm77_lookup is None:
+            return None
+        record = self.mm77_lookup.get(merchant_id)
+        return record.to_dict() if record is not None else None
 
     def reset_me_level(self, level):
         self.me_level_tables.reset_level(level)
@@ -37,10 +163,15 @@ def test_me_level_reset():
 def test_merchant_info_management():
     advance_routine = BeelineAdvanceRoutine()
     advance_routine.manage_merchant_info('merchant1', {'name': 'Merchant A', 'status': 'active'})
-    # Add assertions to verify the merchant information is managed correctly
+    advance_routine.manage_merchant_info('merchant1', {'status': 'suspended'})
+    info = advance_routine.get_merchant_info('merchant1')
+    assert info == {'name': 'Merchant A', 'status': 'suspended'}, "Details should be merged!"
+    assert advance_routine.me_level_tables.merchant_levels('merchant1') == {MERCHANT_INFO_LEVEL}
+    advance_routine.reset_me_level(MERCHANT_INFO_LEVEL)
+    assert advance_routine.get_merchant_info('merchant1') is None, "Merchant info should be reset!"
 
 
 # Running test cases
 if __name__ == '__main__':
     test_me_level_reset()
-    test_merchant_info_management()
\ No newline at end of file
+    test_merchant_info_management()
@@ -1,56 +1,300 @@
-# Beeline Cyclic Loop Implementation
+"""
+BEELINE CYCLIC LOOP
+Single-pass control-break engine for the nightly run.
 
-## Overview
-The BEELINE CYCLIC LOOP is a structured approach that manages workflow in batches and handles various breakpoints efficiently. This script outlines the ISORT formation along with batch-level and ME-level breaks, and includes end-of-job handling.
+The loop consumes the ISORT-ordered GET1 stream from MasterRecordProcessor and
+merges any number of secondary streams (GET2 usage, GET3 links, GET4
+transactions) into it by key. Each master record forms one ME group; an
+ME-level break fires when ISORT1 changes and a batch-level break fires when
+the batch part of ISORT1 (its leading characters) changes. End-of-job handling
+runs once GET1 reaches EOF. Only the current ME group is held in memory.
 
-## ISORT Formation
-The ISORT formation is critical for organizing inputs effectively. This structure ensures all necessary components are sorted and accessible for processing.
+With a checkpoint path the loop periodically saves the GET1 position, the
+secondary stream positions and its accumulators at an ME-group boundary, and
+a restarted run resumes from there instead of from the top of MM77.
+"""
 
-def create_isort(inputs):
-    # Implement ISORT formation logic here
-    isort = sorted(inputs)
-    return isort
+import logging
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
-## Batch Level Breaks
-The batch level breaks manage the flow at the batch level, allowing for effective pausing of operations when necessary.
+from checkpoint import decode_key, encode_key, read_checkpoint, remove_checkpoint, write_checkpoint
+from get1_master_record import MasterRecordProcessor, SequenceError
 
-def handle_batch_breaks(batch_status):
-    if batch_status == 'break':
-        # Logic for handling batch level breaks
-        print("Batch processing paused.")
-        return True
-    return False
+logger = logging.getLogger(__name__)
 
-## ME Level Breaks
-ME level breaks enable a more granular control, stopping processes within the machine's cycle effectively.
+# Leading ISORT1 characters that identify the batch a merchant belongs to
+DEFAULT_BATCH_KEY_LENGTH = 4
 
-def handle_me_breaks(me_status):
-    if me_status == 'break':
-        # Logic for handling ME level breaks
-        print("Machine Element processing paused.")
-        return True
-    return False
+# Default number of ME groups between loop checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 10_000
 
-## End-of-Job Handling
-This function encapsulates the end of job processes, ensuring all tasks are completed and resources are released.
+Key = Union[str, bytes]
+
+
+class MEGroup:
+    """
+    One ME group: a GET1 master record and the secondary-stream items that
+    share its ISORT1 key.
+
+    Attributes:
+        key: ISORT1 of the master record
+        batch_key: Batch part of ISORT1
+        master: The GET1 master record
+        attachments: Mapping of stream name to the items matched to this ME
+    """
+
+    __slots__ = ('key', 'batch_key', 'master', 'attachments')
+
+    def __init__(self, key: Key, batch_key: Key, master: Any, attachments: Dict[str, List]):
+        self.key = key
+        self.batch_key = batch_key
+        self.master = master
+        self.attachments = attachments
+
+
+class _SecondaryStream:
+    """Cursor over one key-ordered secondary stream."""
+
+    __slots__ = ('name', 'items', 'key', 'pending', 'pending_key', 'orphans', 'out_of_sequence',
+                 'pulled')
+
+    def __init__(self, name: str, items: Iterable, key: Callable[[Any], Key],
+                 state: Optional[Dict] = None):
+        self.name = name
+        self.items = iter(items)
+        self.key = key
+        self.pending = None
+        self.pending_key = None
+        self.orphans = 0
+        self.out_of_sequence = 0
+        self.pulled = 0
+        if state is not None:
+            # Restarted stream: skip the items consumed before the checkpoint
+            for _ in islice(self.items, state['position']):
+                self.pulled += 1
+            self.orphans = state['orphans']
+            self.out_of_sequence = state['out_of_sequence']
+        self.advance()
+
+    def checkpoint_state(self) -> Dict:
+        """Position of the pending item plus counters, for a loop checkpoint."""
+        position = self.pulled - 1 if self.pending_key is not None else self.pulled
+        return {'position': position, 'orphans': self.orphans,
+                'out_of_sequence': self.out_of_sequence}
+
+    def advance(self) -> None:
+        """Move to the next in-sequence item, counting and dropping regressions."""
+        previous_key = self.pending_key
+        for item in self.items:
+            self.pulled += 1
+            item_key = self.key(item)
+            if previous_key is not None and item_key < previous_key:
+                self.out_of_sequence += 1
+                logger.warning("BEELINE: %s item out of sequence (key %r after %r), skipped",
+                               self.name, item_key, previous_key)
+                continue
+            self.pending, self.pending_key = item, item_key
+            return
+        self.pending = self.pending_key = None
+
+    def take(self, master_key: Key) -> List:
+        """Return the items keyed master_key, counting lower keys as orphans."""
+        matched = []
+        while self.pending_key is not None and self.pending_key <= master_key:
+            if self.pending_key == master_key:
+                matched.append(self.pending)
+            else:
+                self.orphans += 1
+            self.advance()
+        return matched
+
+    def drain(self) -> None:
+        """Count every remaining item as an orphan (no master left to join)."""
+        while self.pending_key is not None:
+            self.orphans += 1
+            self.advance()
+
+
+class BeelineCyclicLoop:
+    """
+    Streaming control-break engine over the GET1 master stream.
+
+    Usage:
+        processor = MasterRecordProcessor(mm77_records)
+        loop = BeelineCyclicLoop(processor)
+        loop.add_stream('GET3', ma78_links, key=ma78_link_key(processor))
+        loop.on_me_break(lambda group: ...)
+        loop.on_batch_break(lambda batch_key, me_count: ...)
+        summary = loop.run()
+
+    Secondary streams must be ordered by the same key as ISORT1, and their
+    keys must have its type: bytes when GET1 reads a fixed-width
+    MM77FileReader (ma78_link_key() picks the right one). Their items
+    are attached to the ME group with an equal key. Items without a matching
+    master are counted as orphans, items out of order as out-of-sequence.
+    """
+
+    def __init__(self, processor: MasterRecordProcessor,
+                 batch_key_length: int = DEFAULT_BATCH_KEY_LENGTH,
+                 checkpoint_path: Optional[str] = None,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Args:
+            processor: GET1 processor supplying the ISORT-ordered master stream
+            batch_key_length: Leading ISORT1 characters that form the batch key
+            checkpoint_path: If set, checkpoint here every checkpoint_interval
+                             ME groups and on a GET1 SequenceError, resume from
+                             it on the next run(), and remove it at end of job
+            checkpoint_interval: Number of ME groups between checkpoints
+        """
+        self.processor = processor
+        self.batch_key_length = batch_key_length
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        # JSON-serialisable handler state, saved and restored with checkpoints
+        self.accumulators: Dict[str, Any] = {}
+        self._stream_sources: List[tuple] = []
+        self._me_handlers: List[Callable[[MEGroup], None]] = []
+        self._batch_handlers: List[Callable[[Key, int], None]] = []
+        self._end_of_job_handlers: List[Callable[[Dict], None]] = [end_of_job_cleanup]
+
+    def add_stream(self, name: str, items: Iterable, key: Callable[[Any], Key]) -> None:
+        """Register a key-ordered secondary stream (GET2/GET3/GET4 output)."""
+        self._stream_sources.append((name, items, key))
+
+    def on_me_break(self, handler: Callable[[MEGroup], None]) -> None:
+        """Register a handler called with each completed MEGroup."""
+        self._me_handlers.append(handler)
+
+    def on_batch_break(self, handler: Callable[[Key, int], None]) -> None:
+        """Register a handler called with (batch_key, me_count) as each batch ends."""
+        self._batch_handlers.append(handler)
+
+    def on_end_of_job(self, handler: Callable[[Dict], None]) -> None:
+        """Register a handler called with the run summary at EOF."""
+        self._end_of_job_handlers.append(handler)
+
+    def run(self) -> Dict:
+        """
+        Run the cyclic loop to EOF.
+
+        Returns:
+            Summary with ME and batch counts and per-stream orphan /
+            out-of-sequence counts
+
+        Raises:
+            SequenceError: If GET1 detects an out-of-sequence master record
+        """
+        state = read_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        if state is None:
+            stream_states = {}
+            me_count = batch_count = batch_me_count = 0
+            current_batch: Optional[Key] = None
+        else:
+            self.processor.restore_state(state['get1'])
+            stream_states = state['streams']
+            loop_state = state['loop']
+            me_count, batch_count = loop_state['me_count'], loop_state['batch_count']
+            batch_me_count = loop_state['batch_me_count']
+            current_batch = decode_key(loop_state['current_batch'])
+            self.accumulators = state['accumulators']
+            logger.info("BEELINE: Resuming from checkpoint after %d MEs", me_count)
+        streams = [_SecondaryStream(name, items, key, stream_states.get(name))
+                   for name, items, key in self._stream_sources]
+
+        def save_checkpoint():
+            write_checkpoint(self.checkpoint_path, {
+                'get1': self.processor.checkpoint_state(),
+                'loop': {'me_count': me_count, 'batch_count': batch_count,
+                         'batch_me_count': batch_me_count,
+                         'current_batch': encode_key(current_batch)},
+                'streams': {stream.name: stream.checkpoint_state() for stream in streams},
+                'accumulators': self.accumulators,
+            })
+
+        masters = self.processor.iter_valid_records()
+        while True:
+            try:
+                master = next(masters, None)
+            except SequenceError:
+                # Streams and counters are still at the last ME-group boundary
+                if self.checkpoint_path:
+                    save_checkpoint()
+                raise
+            if master is None:
+                break
+            key = self.processor.isort1
+            batch_key = key[:self.batch_key_length]
+
+            # Batch-level break: the batch part of ISORT1 changed
+            if current_batch is not None and batch_key != current_batch:
+                self._batch_break(current_batch, batch_me_count)
+                batch_count += 1
+                batch_me_count = 0
+            current_batch = batch_key
+
+            # ME-level break: each master record closes one ME group
+            attachments = {stream.name: stream.take(key) for stream in streams}
+            group = MEGroup(key, batch_key, master, attachments)
+            for handler in self._me_handlers:
+                handler(group)
+            me_count += 1
+            batch_me_count += 1
+            if self.checkpoint_path and me_count % self.checkpoint_interval == 0:
+                save_checkpoint()
+
+        if current_batch is not None:
+            self._batch_break(current_batch, batch_me_count)
+            batch_count += 1
+
+        for stream in streams:
+            stream.drain()
+
+        summary = {
+            'me_count': me_count,
+            'batch_count': batch_count,
+            'orphans': {stream.name: stream.orphans for stream in streams},
+            'out_of_sequence': {stream.name: stream.out_of_sequence for stream in streams},
+        }
+        for handler in self._end_of_job_handlers:
+            handler(summary)
+        if self.checkpoint_path:
+            remove_checkpoint(self.checkpoint_path)
+        return summary
+
+    def _batch_break(self, batch_key: Key, me_count: int) -> None:
+        for handler in self._batch_handlers:
+            handler(batch_key, me_count)
+
+
+def end_of_job_cleanup(summary: Dict) -> None:
+    """Default end-of-job handler: log the run totals."""
+    logger.info("BEELINE: End of job - %d MEs in %d batches, orphans %s, out of sequence %s",
+                summary['me_count'], summary['batch_count'],
+                summary['orphans'], summary['out_of_sequence'])
 
-def end_of_job_cleanup():
-    # Implement end of job cleanup logic here
-    print("Cleaning up resources and completing the job.")
 
 # Main execution function
 if __name__ == '__main__':
-    inputs = [...]  # Input data for ISORT
-    isort = create_isort(inputs)
-    print(f"Initial ISORT: {isort}")
-    
-    # Simulate batch level processing
-    if handle_batch_breaks('continue'):
-        pass  # Perform batch processing logic
-    
-    # Simulate ME level processing
-    if handle_me_breaks('continue'):
-        pass  # Perform ME processing logic
-    
-    # Clean up at the end of the job
-    end_of_job_cleanup()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+
+    mm77_records = [
+        {'M100': 'D', 'M101': 'A0010001'},
+        {'M100': 'D', 'M101': 'A0010002'},
+        {'M100': 'P', 'M101': 'A0020000'},  # Parent - bypassed by GET1
+        {'M100': 'D', 'M101': 'A0020001'},
+        {'M100': 'D', 'M101': 'Z9999999'},  # EOF
+    ]
+    # GET2 ME-wise usage, keyed and ordered like ISORT1
+    pos_usage = [('A0010001', {'TID001': 3}), ('A0020001', {'TID007': 1})]
+
+    loop = BeelineCyclicLoop(MasterRecordProcessor(mm77_records))
+    loop.add_stream('GET2', pos_usage, key=lambda item: item[0].ljust(10, ' '))
+    loop.on_me_break(lambda group: print(f"ME break: {group.key.strip()} {group.attachments}"))
+    loop.on_batch_break(lambda batch_key, count: print(f"Batch break: {batch_key} ({count} MEs)"))
+
+    try:
+        print(f"Summary: {loop.run()}")
+    except SequenceError as e:
+        print(f"ERROR: {e}")
@@ -0,0 +1,2 @@
+"""Benchmarks for the GET1-GET4 pipeline. Run from the repository root, e.g.
+``python -m benchmarks.bench_record_memory``."""
@@ -0,0 +1,85 @@
+"""
+RECORD MEMORY BENCHMARK
+Bytes per record for plain dict / __dict__ records versus the compact slotted
+MM77Record and TransactionRecord types, on a synthetic batch.
+
+Usage:
+    python -m benchmarks.bench_record_memory [--rows 1000000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, List
+
+from get1_master_record import MM77Record
+
+
+class DictTransactionRecord:
+    """
+    Pre-slots TransactionRecord layout, kept as the 'before' baseline. It
+    carries the same precomputed sort keys, so only the layout differs.
+    """
+
+    def __init__(self, record_id, amount, date):
+        from get4_transaction_records import TransactionRecord
+        keyed = TransactionRecord(record_id, amount, date)
+        self.record_id = record_id
+        self.amount = amount
+        self.date = date
+        self.amount_key = keyed.amount_key
+        self.date_key = keyed.date_key
+
+
+def measure_bytes_per_record(build: Callable[[int], List], rows: int) -> float:
+    """Return traced bytes allocated per record by build(rows)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        batch = build(rows)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del batch
+    return (after - before) / rows
+
+
+def mm77_dicts(rows: int) -> List:
+    return [{'M100': 'D', 'M101': f'M{i:09d}', 'NAME': 'Merchant', 'M102': 'P000000001'}
+            for i in range(rows)]
+
+
+def mm77_compact(rows: int) -> List:
+    return [MM77Record('D', f'M{i:09d}', 'Merchant', 'P000000001') for i in range(rows)]
+
+
+def transactions_dict(rows: int) -> List:
+    return [DictTransactionRecord(i, i * 0.01, '2026-02-08') for i in range(rows)]
+
+
+def transactions_slotted(rows: int) -> List:
+    # Deferred so the MM77 comparison runs without GET4's dependencies
+    from get4_transaction_records import TransactionRecord
+    return [TransactionRecord(i, i * 0.01, '2026-02-08') for i in range(rows)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic batch size')
+    args = parser.parse_args()
+
+    comparisons = [
+        ('MM77 master record', mm77_dicts, mm77_compact),
+        ('GET4 TransactionRecord', transactions_dict, transactions_slotted),
+    ]
+    print(f"{'record type':<24}{'before B/rec':>14}{'after B/rec':>14}{'saving':>10}")
+    for label, before, after in comparisons:
+        before_bytes = measure_bytes_per_record(before, args.rows)
+        after_bytes = measure_bytes_per_record(after, args.rows)
+        saving = 1 - after_bytes / before_bytes
+        print(f"{label:<24}{before_bytes:>14.1f}{after_bytes:>14.1f}{saving:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
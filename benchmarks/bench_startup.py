@@ -0,0 +1,121 @@
+"""
+STARTUP BENCHMARK
+Cold-start cost of each GET module in a fresh interpreter: import time and
+the latency of the first record, plus import-time side effects (heavy
+optional dependencies loaded, root logging handlers installed, files
+written) that short-lived scheduler workers would pay for.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--max-import-ms 50]
+
+The exit status is 1 if any module has an import side effect or, with
+--max-import-ms, if its median import time exceeds the limit.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+# Stage -> (module, first-record statement run after the import)
+STAGES = {
+    'get1': ('get1_master_record',
+             "m.MasterRecordProcessor([{'M100': 'D', 'M101': 'A001'}]).get_next_record()"),
+    'get2': ('get2_pos_usage',
+             "m.get2_pos_usage([{'tid': 'T1', 'date': m.DEFAULT_BUSINESS_DATE}])"),
+    'get3': ('get3_merchant_account_links',
+             "m.process_merchant_account_links({'field1': 1, 'field2': 2, 'field3': 3})"),
+    'get4': ('get4_transaction_records',
+             "m.process_records([{'id': 'T1', 'amount': '1.00', 'date': '2026-02-08'}])"),
+}
+
+# Dependencies that must only be imported by the code paths that use them
+HEAVY_MODULES = ('requests', 'numpy', 'multiprocessing')
+
+_CHILD = '''
+import importlib, json, logging, sys, time
+started = time.perf_counter()
+m = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+heavy = [name for name in sys.argv[3:] if name in sys.modules]
+handlers = len(logging.getLogger().handlers)
+{statement}
+done = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'first_record_ms': (done - imported) * 1000,
+                  'heavy_modules': heavy, 'root_handlers': handlers}}))
+'''
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_once(stage: str) -> Dict:
+    """Import one GET module in a fresh interpreter and time its first record."""
+    module, statement = STAGES[stage]
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            filter(None, [_REPO_ROOT, os.environ.get('PYTHONPATH')])))
+        completed = subprocess.run(
+            [sys.executable, '-c', _CHILD.format(statement=statement), module, stage,
+             *HEAVY_MODULES],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout)
+        # The module should not leave anything (e.g. log files) in the working directory
+        result['files_written'] = sorted(os.listdir(workdir))
+    return result
+
+
+def measure_startup(stage: str, runs: int = 5) -> Dict:
+    """Median import and first-record times over several cold starts."""
+    samples = [measure_once(stage) for _ in range(runs)]
+    last = samples[-1]
+    return {
+        'stage': stage,
+        'module': STAGES[stage][0],
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'first_record_ms': statistics.median(s['first_record_ms'] for s in samples),
+        'heavy_modules': last['heavy_modules'],
+        'root_handlers': last['root_handlers'],
+        'files_written': last['files_written'],
+    }
+
+
+def side_effects(result: Dict) -> List[str]:
+    """Describe the import side effects found in one measure_startup() result."""
+    effects = [f"imports {name}" for name in result['heavy_modules']]
+    if result['root_handlers']:
+        effects.append(f"installs {result['root_handlers']} root logging handler(s)")
+    effects += [f"writes {name}" for name in result['files_written']]
+    return effects
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per module')
+    parser.add_argument('--max-import-ms', type=float,
+                        help='fail if a median import time exceeds this')
+    parser.add_argument('--save', metavar='PATH', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    results = [measure_startup(stage, args.runs) for stage in STAGES]
+    failed = False
+    print(f"{'module':<32}{'import ms':>11}{'first rec ms':>14}  side effects")
+    for r in results:
+        effects = side_effects(r)
+        too_slow = args.max_import_ms is not None and r['import_ms'] > args.max_import_ms
+        failed = failed or bool(effects) or too_slow
+        note = ', '.join(effects) or '-'
+        if too_slow:
+            note += f" (import over {args.max_import_ms:g} ms)"
+        print(f"{r['module']:<32}{r['import_ms']:>11.1f}{r['first_record_ms']:>14.2f}  {note}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
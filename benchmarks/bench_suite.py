@@ -0,0 +1,284 @@
+"""
+GET1-GET4 BENCHMARK SUITE
+Throughput, per-record latency and peak RSS of the real GET stages on seeded
+synthetic data, with JSON baselines for regression checks.
+
+Stages:
+    get1         MasterRecordProcessor.process_all_records() over MM77 rows
+    get2         get2_pos_usage() over POS usage rows
+    get3         process_merchant_account_links() over MA78 rows
+    get4-process process_records() over transaction JSON objects
+    get4-sort    sort_records() over processed TransactionRecords
+
+Each (stage, scale) case runs in a fresh process, so peak RSS is that case's
+own high-water mark (data generation included). Latency percentiles are
+per-record call times over the first --latency-sample rows of the batch.
+
+Usage:
+    python -m benchmarks.bench_suite [--scales 10k,100k,1m] [--stages get1,get2]
+        [--save baseline.json] [--compare baseline.json] [--tolerance 0.10]
+
+With --compare the exit status is 1 if any case's rows/sec fell by more than
+the tolerance against the baseline.
+"""
+
+import argparse
+import gc
+import json
+import math
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from benchmarks.generators import (
+    DEFAULT_SEED, generate_ma78, generate_mm77, generate_pos, generate_transactions,
+)
+
+DEFAULT_SCALES = '10k,100k'
+DEFAULT_LATENCY_SAMPLE = 10_000
+DEFAULT_TOLERANCE = 0.10
+
+_SCALE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_scale(text: str) -> int:
+    """Parse a row count such as '10k', '1m' or '250000'."""
+    text = text.strip().lower().replace('_', '')
+    multiplier = _SCALE_SUFFIXES.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentile(sorted_values: List[int], pct: float) -> int:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _per_call(function: Callable, records) -> List[int]:
+    """Nanoseconds taken by function(record) for each record."""
+    clock = time.perf_counter_ns
+    latencies = []
+    for record in records:
+        started = clock()
+        function(record)
+        latencies.append(clock() - started)
+    return latencies
+
+
+# Stage definitions: (generator, batch run, per-record latency or None)
+
+def _get1_run(records):
+    from get1_master_record import MasterRecordProcessor
+    MasterRecordProcessor(records).process_all_records()
+
+
+def _get1_latencies(records):
+    from get1_master_record import MasterRecordProcessor
+    processor = MasterRecordProcessor(records)
+    clock = time.perf_counter_ns
+    latencies = []
+    while True:
+        started = clock()
+        record = processor.get_next_record()
+        latencies.append(clock() - started)
+        if record is None:
+            return latencies
+
+
+def _get2_run(records):
+    from get2_pos_usage import get2_pos_usage
+    get2_pos_usage(records)
+
+
+def _get2_latencies(records):
+    from get2_pos_usage import get2_pos_usage
+    return _per_call(lambda record: get2_pos_usage((record,)), records)
+
+
+def _get3_run(records):
+    from get3_merchant_account_links import process_merchant_account_links
+    for record in records:
+        process_merchant_account_links(record)
+
+
+def _get3_latencies(records):
+    from get3_merchant_account_links import process_merchant_account_links
+    return _per_call(process_merchant_account_links, records)
+
+
+def _get4_process_run(records):
+    from get4_transaction_records import process_records
+    process_records(records)
+
+
+def _get4_process_latencies(records):
+    from get4_transaction_records import process_records
+    return _per_call(lambda record: process_records((record,)), records)
+
+
+def _get4_sort_generate(rows, seed):
+    from get4_transaction_records import process_records
+    return process_records(generate_transactions(rows, seed))
+
+
+def _get4_sort_run(records):
+    from get4_transaction_records import sort_records
+    sort_records(records)
+
+
+STAGES = {
+    'get1': (generate_mm77, _get1_run, _get1_latencies),
+    'get2': (generate_pos, _get2_run, _get2_latencies),
+    'get3': (generate_ma78, _get3_run, _get3_latencies),
+    'get4-process': (generate_transactions, _get4_process_run, _get4_process_latencies),
+    'get4-sort': (_get4_sort_generate, _get4_sort_run, None),
+}
+
+
+def run_case(stage: str, rows: int, seed: int = DEFAULT_SEED,
+             latency_sample: int = DEFAULT_LATENCY_SAMPLE) -> Dict:
+    """Run one stage at one scale and return its result record."""
+    generate, run, latencies_of = STAGES[stage]
+    data = generate(rows, seed)
+    gc.collect()
+    started = time.perf_counter()
+    run(data)
+    seconds = time.perf_counter() - started
+
+    result = {'stage': stage, 'rows': rows, 'seconds': seconds,
+              'rows_per_sec': rows / seconds if seconds else None,
+              'p50_us': None, 'p99_us': None}
+    if latencies_of is not None and latency_sample:
+        latencies = sorted(latencies_of(data[:latency_sample]))
+        result['p50_us'] = percentile(latencies, 50) / 1000
+        result['p99_us'] = percentile(latencies, 99) / 1000
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def run_suite(stages: List[str], scales: List[int], seed: int = DEFAULT_SEED,
+              latency_sample: int = DEFAULT_LATENCY_SAMPLE, isolate: bool = True) -> List[Dict]:
+    """Run every (stage, scale) case, each in a fresh process when isolate is set."""
+    cases = [(stage, rows, seed, latency_sample) for stage in stages for rows in scales]
+    if not isolate:
+        return [run_case(*case) for case in cases]
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(run_case, *case).result())
+    return results
+
+
+def save_baseline(path: str, results: List[Dict], seed: int) -> None:
+    """Write results plus the environment they were measured in as JSON."""
+    document = {
+        'meta': {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'seed': seed},
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def load_baseline(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Compare results with a baseline document.
+
+    Returns:
+        One entry per case present in both, with the baseline and current
+        rows/sec, the relative change and whether it is a regression
+    """
+    previous = {(r['stage'], r['rows']): r for r in baseline['results']}
+    comparisons = []
+    for result in results:
+        before = previous.get((result['stage'], result['rows']))
+        if before is None or not before['rows_per_sec'] or not result['rows_per_sec']:
+            continue
+        change = result['rows_per_sec'] / before['rows_per_sec'] - 1
+        comparisons.append({'stage': result['stage'], 'rows': result['rows'],
+                            'baseline_rows_per_sec': before['rows_per_sec'],
+                            'rows_per_sec': result['rows_per_sec'], 'change': change,
+                            'regression': change < -tolerance})
+    return comparisons
+
+
+def _format(value, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def print_results(results: List[Dict], comparisons: Optional[List[Dict]] = None) -> None:
+    changes = {(c['stage'], c['rows']): c for c in comparisons or ()}
+    print(f"{'stage':<14}{'rows':>11}{'rows/s':>13}{'p50 us':>9}{'p99 us':>9}"
+          f"{'peak MB':>9}{'vs base':>10}")
+    for r in results:
+        rss = r['peak_rss_bytes'] / 2 ** 20 if r['peak_rss_bytes'] is not None else None
+        change = changes.get((r['stage'], r['rows']))
+        delta = '-' if change is None else \
+            f"{change['change']:+.1%}{' !' if change['regression'] else ''}"
+        print(f"{r['stage']:<14}{r['rows']:>11,}{_format(r['rows_per_sec'], ',.0f'):>13}"
+              f"{_format(r['p50_us'], '.2f'):>9}{_format(r['p99_us'], '.2f'):>9}"
+              f"{_format(rss, '.0f'):>9}{delta:>10}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='comma-separated row counts, e.g. 10k,100k,1m,10m')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--latency-sample', type=int, default=DEFAULT_LATENCY_SAMPLE,
+                        help='rows timed individually for p50/p99 (0 to skip)')
+    parser.add_argument('--save', metavar='PATH', help='write results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed rows/sec drop against the baseline (fraction)')
+    parser.add_argument('--in-process', action='store_true',
+                        help='run all cases in this process (peak RSS becomes cumulative)')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    scales = [parse_scale(scale) for scale in args.scales.split(',')]
+
+    results = run_suite(stages, scales, args.seed, args.latency_sample,
+                        isolate=not args.in_process)
+    comparisons = compare(results, load_baseline(args.compare), args.tolerance) \
+        if args.compare else None
+    print_results(results, comparisons)
+    if args.save:
+        save_baseline(args.save, results, args.seed)
+    return 1 if comparisons and any(c['regression'] for c in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+TRANSACTION SORT BENCHMARK
+Sort time for GET4 transactions on raw attributes (lexical order for string
+amounts) versus the minor-unit amount / date ordinal keys that
+process_records precomputes, for single and multi-key (date, amount, id)
+orderings.
+
+Usage:
+    python -m benchmarks.bench_transaction_sort [--rows 1000000]
+"""
+
+import argparse
+import time
+
+from benchmarks.generators import generate_transactions
+from get4_transaction_records import process_records, sort_records
+
+
+def raw_sort(records, key_attr):
+    """The pre-normalization sort: getattr on the raw JSON values."""
+    if isinstance(key_attr, str):
+        return sorted(records, key=lambda x: getattr(x, key_attr))
+    return sorted(records, key=lambda x: tuple(getattr(x, name) for name in key_attr))
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic batch size')
+    args = parser.parse_args()
+
+    data = generate_transactions(args.rows)
+    normalize_seconds = timed(process_records, data)
+    records = process_records(data)
+    print(f"process_records (incl. key normalization): {normalize_seconds:.2f}s for {len(records)} rows")
+
+    print(f"{'sort key':<28}{'raw s':>10}{'precomputed s':>16}{'speedup':>10}")
+    for key_attr in ('amount', ('date', 'amount', 'record_id')):
+        before = timed(raw_sort, records, key_attr)
+        after = timed(sort_records, records, key_attr)
+        label = key_attr if isinstance(key_attr, str) else ','.join(key_attr)
+        print(f"{label:<28}{before:>10.2f}{after:>16.2f}{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+SEEDED BENCHMARK DATA
+Deterministic synthetic MM77, POS usage, MA78 and GET4 transaction records.
+The same (rows, seed) always produces the same batch, so results from
+different runs and machines describe the same workload.
+"""
+
+import random
+from typing import Dict, List
+
+from get2_pos_usage import DEFAULT_BUSINESS_DATE
+
+DEFAULT_SEED = 13
+
+# Share of MM77 rows that are parent (M100 = "P") records bypassed by GET1
+PARENT_RATIO = 0.02
+
+# Share of POS rows dated on the business date
+BUSINESS_DATE_RATIO = 0.9
+
+
+def meid(index: int) -> str:
+    """MEID of the index-th merchant: 10 characters, ascending with index."""
+    return f'M{index:09d}'
+
+
+def generate_mm77(rows: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """MM77 rows in ISORT1 order, with parents mixed in and a "Z" EOF marker last."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows - 1):
+        parent = rng.random() < PARENT_RATIO
+        records.append({'M100': 'P' if parent else 'D', 'M101': meid(i),
+                        'NAME': f'Merchant {i}', 'M102': '' if parent else meid(i - i % 50)})
+    records.append({'M100': 'D', 'M101': 'Z999999999', 'NAME': 'EOF', 'M102': ''})
+    return records
+
+
+def generate_pos(rows: int, seed: int = DEFAULT_SEED, merchants: int = 10_000,
+                 business_date: str = DEFAULT_BUSINESS_DATE) -> List[Dict]:
+    """POS usage rows spread over a merchant population, mostly on the business date."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        merchant = rng.randrange(merchants)
+        date = business_date if rng.random() < BUSINESS_DATE_RATIO else '2026-02-07'
+        records.append({'tid': f'T{merchant:06d}{rng.randrange(4)}', 'date': date,
+                        'meid': meid(merchant)})
+    return records
+
+
+def generate_ma78(rows: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """MA78 link rows in ISORT1 order, one to three links per merchant."""
+    rng = random.Random(seed)
+    records = []
+    merchant = 0
+    while len(records) < rows:
+        for link in range(min(rng.randint(1, 3), rows - len(records))):
+            records.append({'M101': meid(merchant), 'field1': f'ACCT{merchant:09d}{link}',
+                            'field2': rng.choice(('DDA', 'SAV', 'GL')), 'field3': str(link)})
+        merchant += 1
+    return records
+
+
+def generate_transactions(rows: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """GET4 transaction JSON objects with string amounts and ISO dates."""
+    rng = random.Random(seed)
+    return [{'id': f'T{i:09d}',
+             'amount': f'{rng.randrange(1, 10_000_000) / 100:.2f}',
+             'date': f'2026-01-{rng.randrange(1, 32):02d}'}
+            for i in range(rows)]
@@ -0,0 +1,75 @@
+"""
+CHECKPOINT FILES
+Atomic JSON checkpoint files shared by the GET1 scan, the BEELINE cyclic loop
+and the incremental GET2 state, plus the atomic write they are built on (also
+used for the MM77 lookup store).
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, Optional, Union
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w') -> Iterator[IO]:
+    """
+    Open a temporary file to write path's new content to. When the block
+    completes it is flushed to disk and renamed over path, so a crash leaves
+    either the old or the new file, never a torn one. If the block raises,
+    the temporary file is removed and path is left untouched.
+    """
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_checkpoint(path: str, state: Dict) -> None:
+    """Write a checkpoint atomically (see atomic_write())."""
+    with atomic_write(path) as f:
+        json.dump(state, f)
+
+
+def read_checkpoint(path: str) -> Optional[Dict]:
+    """Return the saved state, or None if no checkpoint exists."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def remove_checkpoint(path: str) -> None:
+    """Delete a checkpoint once the job it covers has completed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def encode_key(key: Union[str, bytes, None]) -> Optional[Dict]:
+    """Encode an ISORT1 key (str or bytes) for JSON."""
+    if key is None:
+        return None
+    if isinstance(key, bytes):
+        return {'bytes': key.hex()}
+    return {'str': key}
+
+
+def decode_key(encoded: Optional[Dict]) -> Union[str, bytes, None]:
+    """Inverse of encode_key()."""
+    if encoded is None:
+        return None
+    if 'bytes' in encoded:
+        return bytes.fromhex(encoded['bytes'])
+    return encoded['str']
@@ -4,12 +4,84 @@ This module implements the master record retrieval logic from the pseudocode spe
 """
 
 import logging
-from typing import List, Dict, Optional, Tuple
+import operator
+import time
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from checkpoint import decode_key, encode_key, read_checkpoint, remove_checkpoint, write_checkpoint
+from instrumentation import registry
+
+# Library module: logging is configured by the caller (see __main__ below)
 logger = logging.getLogger(__name__)
 
+# Default number of MM77 rows between INFO progress summaries
+DEFAULT_PROGRESS_INTERVAL = 1_000_000
+
+# Default number of valid records between GET1 checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 100_000
+
+# MM77 rows per chunk in the bulk sequence pre-scan
+DEFAULT_PRESCAN_CHUNK_SIZE = 100_000
+
+# Sentinel returned by next() once the MM77 stream is exhausted
+_END_OF_STREAM = object()
+
+# Kinds of MM77 row, as told apart by GET1 before sequence validation
+_DETAIL, _PARENT, _MISSING_MEID, _EOF_MARKER = range(4)
+
+
+def _classify_record(record: Dict) -> int:
+    """Kind of a dict MM77 row, from its decoded M101 and M100."""
+    meid = record.get('M101', '')
+    if not meid:
+        return _MISSING_MEID
+    # G10: Check if first digit of M101 (MEID) is "Z"
+    if str(meid)[0] == "Z":
+        return _EOF_MARKER
+    # G10: Check if M100 = "P" (PARENT)
+    if record.get('M100', '') == "P":
+        return _PARENT
+    return _DETAIL
+
+
+def _view_classifier(layout):
+    """
+    Kind of a fixed-width row (mm77_reader.MM77RecordView), from the raw
+    bytes of M101 and M100: the same tests as _classify_record without
+    decoding either field.
+    """
+    blank_meid = layout.encode_field('M101', '')
+    eof_byte = layout.encode_field('M101', 'Z')[0]
+    parent = layout.encode_field('M100', 'P') if 'M100' in layout.fields else None
+
+    def classify(view) -> int:
+        if view.raw_equals('M101', blank_meid):
+            return _MISSING_MEID
+        if view.first_byte('M101') == eof_byte:
+            return _EOF_MARKER
+        if parent is not None and view.raw_equals('M100', parent):
+            return _PARENT
+        return _DETAIL
+    return classify
+
+
+def eof_key_after(psort1: Union[str, bytes, None]) -> Union[str, bytes]:
+    """EOF ISORT1 key of the same type as the preceding key."""
+    if isinstance(psort1, bytes):
+        return b"\xff" * len(psort1)
+    return "Z" * 10
+
+
+def sequence_error_message(isort1: Union[str, bytes], psort1: Union[str, bytes]) -> str:
+    """Message carried by SequenceError for an ISORT1 <= PSORT1 violation."""
+    return (
+        f"Sequence Error: ISORT1 ('{isort1}') must be > PSORT1 ('{psort1}'). "
+        f"Records are out of sequence."
+    )
+
 
 class MasterRecordException(Exception):
     """Custom exception for master record processing errors."""
@@ -17,8 +89,11 @@ class MasterRecordException(Exception):
 
 
 class SequenceError(MasterRecordException):
-    """Raised when records are out of sequence."""
-    pass
+    """Raised when records are out of sequence; pm is the offending row."""
+    
+    def __init__(self, message: str, pm: Optional[int] = None):
+        super().__init__(message)
+        self.pm = pm
 
 
 class EndOfFileError(MasterRecordException):
@@ -26,32 +101,216 @@ class EndOfFileError(MasterRecordException):
     pass
 
 
+# Fields carried by the compact MM77Record type
+MM77_FIELDS = ('M100', 'M101', 'NAME', 'M102')
+
+
+class MM77Record:
+    """
+    Compact MM77 master record.
+    
+    A __slots__ class with no per-instance __dict__, for batch runs where dict
+    overhead dominates RSS. Supports the dict-style get()/item access used by
+    MasterRecordProcessor, so it can be passed wherever a record dict is.
+    
+    Attributes:
+        M100: Record type (P=PARENT, other=DETAIL)
+        M101: MEID (Merchant ID)
+        NAME: Merchant name
+        M102: Parent MEID
+    """
+    
+    __slots__ = MM77_FIELDS
+    _field_set = frozenset(MM77_FIELDS)
+    
+    def __init__(self, M100: str = '', M101: str = '', NAME: str = '', M102: str = ''):
+        self.M100 = M100
+        self.M101 = M101
+        self.NAME = NAME
+        self.M102 = M102
+    
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'MM77Record':
+        """
+        Build a compact record from a record dict.
+        
+        Args:
+            record: Master record dictionary; keys outside MM77_FIELDS are dropped
+            
+        Returns:
+            MM77Record carrying the MM77_FIELDS values
+        """
+        return cls(record.get('M100', ''), record.get('M101', ''),
+                   record.get('NAME', ''), record.get('M102', ''))
+    
+    def get(self, name: str, default=None):
+        """Return a field value, or default if the field is not carried."""
+        if name in self._field_set:
+            return getattr(self, name)
+        return default
+    
+    def __getitem__(self, name: str) -> str:
+        if name not in self._field_set:
+            raise KeyError(name)
+        return getattr(self, name)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._field_set
+    
+    def to_dict(self) -> Dict[str, str]:
+        """Return the record as a plain dict."""
+        return {name: getattr(self, name) for name in MM77_FIELDS}
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MM77Record):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in MM77_FIELDS)
+        return f"MM77Record({fields})"
+
+
+class SequenceScanReport:
+    """
+    Result of MasterRecordProcessor.prescan_sequence().
+    
+    Attributes:
+        rows: MM77 rows scanned (up to and including the EOF marker)
+        valid_records: Non-parent records that GET1 would return
+        parent_count: Parent records (M100 = "P") bypassed
+        missing_meid: Positions of rows without an M101 (MEID)
+        breaks: (pm, ISORT1, PSORT1) for every row whose ISORT1 is not greater
+                than the previous valid row's
+        eof_position: pm of the "Z" EOF marker, or of the physical end of MM77
+        eof_marker: True if EOF was an explicit "Z" marker record
+        elapsed: Scan time in seconds
+    """
+    
+    def __init__(self):
+        self.rows = 0
+        self.valid_records = 0
+        self.parent_count = 0
+        self.missing_meid: List[int] = []
+        self.breaks: List[Tuple[int, Union[str, bytes], Union[str, bytes]]] = []
+        self.eof_position: Optional[int] = None
+        self.eof_marker = False
+        self.elapsed = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        """True if GET1 would process the whole file without a SequenceError."""
+        return not self.breaks
+    
+    @property
+    def records_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class _StageStats:
+    """Feeds one instrumented GET1 scan into the instrumentation registry."""
+    
+    def __init__(self, processor: 'MasterRecordProcessor'):
+        self.processor = processor
+        self.start_rows = processor.rows_read
+        self.start_parents = processor.parents_skipped
+        self.start_missing = processor.missing_meid
+        self.records_out = 0
+        # One stage call per scan, entered around each fetch only: the time
+        # the caller spends on a yielded record is not GET1's
+        self.call = registry.open_stage('get1')
+    
+    def timed_next(self) -> Optional[Dict]:
+        with self.call:
+            record = self.processor.get_next_record()
+        if record is not None:
+            self.records_out += 1
+        return record
+    
+    def record(self) -> None:
+        processor = self.processor
+        self.call.close()
+        rows = processor.rows_read - self.start_rows
+        registry.count('get1.records_in', rows)
+        registry.count('get1.records_out', self.records_out)
+        registry.count('get1.parents_skipped', processor.parents_skipped - self.start_parents)
+        registry.count('get1.missing_meid', processor.missing_meid - self.start_missing)
+        # Fixed-width sources (mm77_reader.MM77FileReader) read whole records
+        stride = getattr(processor.mm77_records, 'stride', None)
+        if stride is not None:
+            registry.count('get1.bytes_read', rows * stride)
+
+
 class MasterRecordProcessor:
     """
     Processes merchant master records from MM77 table.
     
+    Records are consumed as a single-pass stream, so MM77 may be supplied as a
+    list, a generator, a file reader or a database cursor; only the previous
+    ISORT1 is retained between records.
+    
+    Per-record diagnostics are logged at DEBUG level only and are formatted
+    lazily, so they cost a single level check when DEBUG is disabled. At INFO
+    level the processor emits a progress summary every ``progress_interval``
+    rows with the current throughput.
+    
     Attributes:
-        mm77_records: List of master records (each record is a dict with fields like M100, M101)
+        mm77_records: Source of master records (each record is a dict with fields like M100, M101)
         pm: Pointer to current position in MM77
         psort1: Previous sort key value for sequence validation
         isort1: Current sort key value
+        progress_interval: Rows between progress summaries (0 disables them)
+        checkpoint_path: File that iter_valid_records() checkpoints to, if any
     """
     
-    def __init__(self, mm77_records: List[Dict]):
+    def __init__(self, mm77_records: Iterable[Dict],
+                 progress_interval: int = DEFAULT_PROGRESS_INTERVAL,
+                 checkpoint_path: Optional[str] = None,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
         """
         Initialize the processor with master records.
         
         Args:
-            mm77_records: List of master record dictionaries containing at least:
+            mm77_records: Iterable of master record dictionaries containing at least:
                          - M100: Record type (P=PARENT, other=DETAIL)
                          - M101: MEID (Merchant ID) - first digit determines record type
                          - Other fields as needed for ISORT1 formation
+            progress_interval: Number of rows between INFO progress summaries;
+                               0 disables progress logging
+            checkpoint_path: If set, iter_valid_records() writes a checkpoint
+                             every checkpoint_interval records and on a
+                             SequenceError, and removes it at EOF
+            checkpoint_interval: Number of valid records between checkpoints
         """
         self.mm77_records = mm77_records
+        self._records: Iterator[Dict] = iter(mm77_records)
         self.pm = -1  # Pointer to current row (starts at -1, will be incremented to 0)
         self.psort1 = None  # Previous ISORT1 value
         self.isort1 = None  # Current ISORT1 value
         self.eof_reached = False
+        self.progress_interval = progress_interval
+        self._next_progress = progress_interval
+        self._started_at: Optional[float] = None
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self._resume_pm = -1  # pm of the last record handed to the caller
+        self.rows_read = 0  # MM77 rows fetched so far (EOF marker included)
+        self.parents_skipped = 0  # Parent rows bypassed so far
+        self.missing_meid = 0  # Rows without an M101 so far
+        # Fixed-width readers (mm77_reader.MM77FileReader) yield views that
+        # are classified on their raw bytes
+        layout = getattr(mm77_records, 'layout', None)
+        if layout is not None and 'M101' in getattr(layout, 'fields', ()):
+            self._classify = _view_classifier(layout)
+        else:
+            self._classify = _classify_record
+    
+    @property
+    def is_rewindable(self) -> bool:
+        """True if the MM77 source can be re-iterated from the start by reset()."""
+        if isinstance(self.mm77_records, Sequence):
+            return True
+        return iter(self.mm77_records) is not self.mm77_records
     
     def get_next_record(self) -> Optional[Dict]:
         """
@@ -72,48 +331,54 @@ class MasterRecordProcessor:
             SequenceError: If ISORT1 is not greater than PSORT1
             EndOfFileError: When end-of-file is reached
         """
+        # Resolve the DEBUG check once per call rather than once per message
+        debug = logger.isEnabledFor(logging.DEBUG)
+        classify = self._classify
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        
         try:
             while True:
                 # G1: Increment pointer to next row of MM77
                 self.pm += 1
-                logger.info(f"GET1: Incrementing pointer to pm={{self.pm}}")
+                if self._next_progress and self.pm >= self._next_progress:
+                    self._log_progress()
                 
-                # Check bounds
-                if self.pm >= len(self.mm77_records):
+                # Fetch the next row from the stream
+                current_record = next(self._records, _END_OF_STREAM)
+                if current_record is _END_OF_STREAM:
                     # End of file condition
-                    self.isort1 = "Z" * 10  # All "Z"s represents EOF
+                    self.isort1 = self._eof_isort1()  # All "Z"s represents EOF
                     self.eof_reached = True
-                    logger.info("GET1: End of file reached - all records processed")
+                    logger.info("GET1: End of file reached after %d rows", self.pm)
                     self._validate_sequence()
                     return None
                 
-                current_record = self.mm77_records[self.pm]
-                logger.info(f"GET1: Processing record at pm={{self.pm}}: {{current_record}}")
+                self.rows_read += 1
+                if debug:
+                    logger.debug("GET1: Processing record at pm=%d: %r", self.pm, current_record)
                 
-                # G10: Check if first digit of M101 (MEID) is "Z"
-                meid = current_record.get('M101', '')
-                if not meid:
-                    logger.warning(f"GET1: Record at pm={{self.pm}} missing M101 (MEID) field")
+                # G10: Check if first digit of M101 (MEID) is "Z", then M100
+                kind = classify(current_record)
+                if kind == _MISSING_MEID:
+                    logger.warning("GET1: Record at pm=%d missing M101 (MEID) field", self.pm)
+                    self.missing_meid += 1
                     continue
                 
-                first_digit_meid = str(meid)[0]
-                
-                if first_digit_meid != "Z":
-                    logger.debug(f"GET1: MEID first digit '{{first_digit_meid}}' is not 'Z', processing record")
-                    
-                    # G10: Check if M100 = "P" (PARENT) - bypass parent records
-                    m100 = current_record.get('M100', '')
-                    if m100 == "P":
-                        logger.info(f"GET1: Record at pm={{self.pm}} is PARENT (M100='P'), bypassing")
+                if kind != _EOF_MARKER:
+                    # G10: M100 = "P" (PARENT) - bypass parent records
+                    if kind == _PARENT:
+                        self.parents_skipped += 1
+                        if debug:
+                            logger.debug("GET1: Record at pm=%d is PARENT (M100='P'), bypassing", self.pm)
                         continue  # Go back to GET1 - fetch next record
                     
                     # Form ISORT1 from the record
                     self.isort1 = self._form_isort1(current_record)
-                    logger.info(f"GET1: Formed ISORT1='{{self.isort1}}'")
                 else:
                     # First digit is "Z" - EOF condition
-                    logger.info(f"GET1: MEID starts with 'Z' - EOF marker detected")
-                    self.isort1 = "Z" * 10  # All "Z"s
+                    logger.info("GET1: MEID starts with 'Z' - EOF marker detected at pm=%d", self.pm)
+                    self.isort1 = self._eof_isort1()  # All "Z"s
                     self.eof_reached = True
                 
                 # G11: Validate sequence - ISORT1 must be > PSORT1
@@ -121,18 +386,28 @@ class MasterRecordProcessor:
                 
                 # G13: Update PSORT1 with current ISORT1
                 self.psort1 = self.isort1
-                logger.info(f"GET1: Updated PSORT1='{{self.psort1}}'")
+                if debug:
+                    logger.debug("GET1: Updated PSORT1='%s'", self.psort1)
                 
                 # Return the processed record
                 if self.eof_reached:
                     return None
                 
+                self._resume_pm = self.pm
                 return current_record
         
         except SequenceError as e:
-            logger.error(f"GET1: Sequence error - {{str(e)}}")
+            logger.error("GET1: Sequence error at pm=%d - %s", self.pm, e)
             raise
     
+    def _log_progress(self) -> None:
+        """Emit an INFO progress summary and schedule the next one."""
+        self._next_progress = self.pm + self.progress_interval
+        if logger.isEnabledFor(logging.INFO):
+            elapsed = time.perf_counter() - self._started_at
+            rate = self.pm / elapsed if elapsed > 0 else 0.0
+            logger.info("GET1: %d rows read, %.0f records/sec", self.pm, rate)
+    
     def _validate_sequence(self) -> None:
         """
         G11: Validate that ISORT1 > PSORT1.
@@ -142,32 +417,41 @@ class MasterRecordProcessor:
         """
         if self.psort1 is None:
             # First record - no previous value to compare
-            logger.info(f"GET1: First record - no sequence validation needed")
             return
         
         if self.isort1 <= self.psort1:
-            error_msg = (
-                f"Sequence Error: ISORT1 ('{{self.isort1}}') must be > PSORT1 ('{{self.psort1}}'). "
-                f"Records are out of sequence."
-            )
-            logger.error(error_msg)
-            raise SequenceError(error_msg)
+            raise SequenceError(sequence_error_message(self.isort1, self.psort1), pm=self.pm)
+    
+    def _eof_isort1(self) -> Union[str, bytes]:
+        """
+        Return the EOF ISORT1 key, matching the type of the keys seen so far.
         
-        logger.debug(f"GET1: Sequence valid - ISORT1 ('{{self.isort1}}') > PSORT1 ('{{self.psort1}}')")
+        Dict records use the all-"Z" key. Byte keys sliced from a fixed-width
+        buffer use HIGH-VALUES (0xFF), which sorts last in any code page.
+        """
+        return eof_key_after(self.psort1)
     
-    def _form_isort1(self, record: Dict) -> str:
+    def _form_isort1(self, record: Dict) -> Union[str, bytes]:
         """
         Form ISORT1 from the master record fields.
         
         ISORT1 is typically a concatenation of key fields that define the sort order.
         This is a template - adjust field names based on actual data structure.
         
+        Records that provide an isort1_key() method (such as the fixed-width
+        views from mm77_reader) supply the key themselves as raw bytes, without
+        decoding any fields.
+        
         Args:
-            record: Master record dictionary
+            record: Master record dictionary or record view
             
         Returns:
-            ISORT1 string value
+            ISORT1 string value (bytes for record views)
         """
+        isort1_key = getattr(record, 'isort1_key', None)
+        if isort1_key is not None:
+            return isort1_key()
+        
         # Template implementation - customize based on your actual data structure
         # Common fields might be: Merchant ID, Chain ID, Store ID, etc.
         
@@ -180,52 +464,241 @@ class MasterRecordProcessor:
         
         isort1 = meid
         
-        logger.debug(f"GET1: Formed ISORT1 from record fields: '{{isort1}}'")
         return isort1
     
-    def process_all_records(self) -> List[Dict]:
+    def iter_valid_records(self) -> Iterator[Dict]:
         """
-        Process all valid records until EOF.
+        Stream all valid records until EOF.
         
-        Returns:
-            List of all valid (non-parent, non-EOF) master records
+        Generator twin of process_all_records(): records are yielded as soon as
+        they pass sequence validation, so memory use does not depend on the
+        size of MM77.
+        
+        Yields:
+            Each valid (non-parent, non-EOF) master record in MM77 order
             
         Raises:
             SequenceError: If any record is out of sequence
         """
-        valid_records = []
-        
+        checkpoint_path = self.checkpoint_path
+        since_checkpoint = 0
+        # Instrumentation is decided once per scan; disabled, it costs nothing per record
+        stats = _StageStats(self) if registry.enabled else None
         try:
             while True:
                 try:
-                    record = self.get_next_record()
+                    if stats is None:
+                        record = self.get_next_record()
+                    else:
+                        record = stats.timed_next()
                     if record is None:
                         # EOF reached
                         logger.info("GET1: Processing complete - EOF reached")
                         break
-                    valid_records.append(record)
+                    yield record
                 except EndOfFileError:
                     logger.info("GET1: EOF marker detected")
                     break
+                
+                # The caller has finished with the record; it is safe to checkpoint
+                if checkpoint_path is not None:
+                    since_checkpoint += 1
+                    if since_checkpoint >= self.checkpoint_interval:
+                        write_checkpoint(checkpoint_path, self.checkpoint_state())
+                        since_checkpoint = 0
         
         except SequenceError as e:
-            logger.error(f"GET1: Halting due to sequence error - {{str(e)}}")
-            logger.info("GET1: Please restart after fixing the sequence error")
+            logger.error("GET1: Halting due to sequence error - %s", e)
+            if checkpoint_path is not None:
+                write_checkpoint(checkpoint_path, self.checkpoint_state())
+                logger.info("GET1: Fix the record at pm=%d and restart; the scan resumes there",
+                            self.pm)
+            else:
+                logger.info("GET1: Please restart after fixing the sequence error")
             raise
+        finally:
+            if stats is not None:
+                stats.record()
+        
+        if checkpoint_path is not None:
+            remove_checkpoint(checkpoint_path)
+    
+    def process_all_records(self) -> List[Dict]:
+        """
+        Process all valid records until EOF.
         
-        return valid_records
+        Returns:
+            List of all valid (non-parent, non-EOF) master records
+            
+        Raises:
+            SequenceError: If any record is out of sequence
+        """
+        return list(self.iter_valid_records())
+    
+    def prescan_sequence(self, chunk_size: int = DEFAULT_PRESCAN_CHUNK_SIZE) -> SequenceScanReport:
+        """
+        Bulk pre-validation pass: check ISORT1 monotonicity over the whole of
+        MM77 in one pass and report every break at once, instead of stopping
+        at the first one like get_next_record().
+        
+        Rows are processed in chunks: keys are formed with list comprehensions
+        and compared pairwise against their predecessor (carried across chunk
+        boundaries). Each break is reported against the previous valid row, so
+        a single misplaced record produces a single break.
+        
+        The scan reads mm77_records independently of the processor's own
+        position; a one-shot iterator is consumed by it.
+        
+        Args:
+            chunk_size: Number of MM77 rows examined per chunk
+            
+        Returns:
+            SequenceScanReport with breaks, parent count, EOF location and throughput
+        """
+        report = SequenceScanReport()
+        form_isort1 = self._form_isort1
+        # Plain records with the stock key can be keyed straight from M101
+        stock_key = type(self)._form_isort1 is MasterRecordProcessor._form_isort1
+        records = iter(self.mm77_records)
+        base = 0
+        previous_key = None
+        started_at = time.perf_counter()
+        
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                report.eof_position = base
+                break
+            meids = [record.get('M101', '') for record in chunk]
+            first_digits = [str(meid)[:1] for meid in meids]
+            
+            # Truncate the chunk at the "Z" EOF marker, if it contains one
+            end = first_digits.index("Z") if "Z" in first_digits else None
+            if end is not None:
+                chunk, meids, first_digits = chunk[:end], meids[:end], first_digits[:end]
+            
+            m100s = [record.get('M100', '') for record in chunk]
+            if "" in first_digits or "P" in m100s:
+                missing = [i for i, digit in enumerate(first_digits) if not digit]
+                report.missing_meid.extend(base + i for i in missing)
+                positions = [i for i, digit in enumerate(first_digits)
+                             if digit and m100s[i] != "P"]
+                report.parent_count += len(chunk) - len(missing) - len(positions)
+            else:
+                positions = range(len(chunk))
+            report.valid_records += len(positions)
+            
+            if stock_key and chunk and not hasattr(chunk[0], 'isort1_key'):
+                keys = [meids[i].ljust(10, ' ') for i in positions]
+            else:
+                keys = [form_isort1(chunk[i]) for i in positions]
+            if keys:
+                if previous_key is not None and keys[0] <= previous_key:
+                    report.breaks.append((base + positions[0], keys[0], previous_key))
+                # Whole-chunk monotonicity test in C; locate breaks only if it fails
+                if not all(map(operator.lt, keys, islice(keys, 1, None))):
+                    report.breaks.extend(
+                        (base + positions[j], keys[j], keys[j - 1])
+                        for j in range(1, len(keys)) if keys[j] <= keys[j - 1]
+                    )
+                previous_key = keys[-1]
+            
+            if end is not None:
+                report.eof_position = base + end
+                report.eof_marker = True
+                break
+            base += len(chunk)
+        
+        report.rows = report.eof_position + (1 if report.eof_marker else 0)
+        # GET1 also validates the EOF key itself against the last PSORT1
+        if previous_key is not None:
+            eof_key = eof_key_after(previous_key)
+            if eof_key <= previous_key:
+                report.breaks.append((report.eof_position, eof_key, previous_key))
+        report.elapsed = time.perf_counter() - started_at
+        
+        logger.info("GET1: Pre-scan of %d rows: %d breaks, %d parents, EOF at pm=%d (%s), "
+                    "%.0f records/sec", report.rows, len(report.breaks), report.parent_count,
+                    report.eof_position, "marker" if report.eof_marker else "end of file",
+                    report.records_per_sec)
+        return report
+    
+    def checkpoint_state(self) -> Dict:
+        """
+        Return the restart state as of the last record handed to the caller.
+        
+        After a SequenceError this still points at the last good record, so a
+        restart re-reads the (fixed) failing record first.
+        """
+        return {'pm': self._resume_pm, 'psort1': encode_key(self.psort1)}
+    
+    def restore_state(self, state: Dict) -> None:
+        """
+        Position a freshly constructed processor at a checkpointed state.
+        
+        Sources exposing iter_from(index) (e.g. MM77FileReader) and sequences
+        are positioned directly; other iterables are assumed to restart from
+        the top of MM77 and are fast-forwarded past the processed rows.
+        
+        Args:
+            state: Dict produced by checkpoint_state()
+        """
+        next_row = state['pm'] + 1
+        source = self.mm77_records
+        if hasattr(source, 'iter_from'):
+            self._records = source.iter_from(next_row)
+        elif isinstance(source, Sequence):
+            self._records = islice(source, next_row, None)
+        else:
+            self._records = iter(source)
+            deque(islice(self._records, next_row), maxlen=0)
+        self.pm = self._resume_pm = state['pm']
+        self.psort1 = self.isort1 = decode_key(state['psort1'])
+        self.eof_reached = False
+        self._next_progress = self.pm + self.progress_interval if self.progress_interval else 0
+        logger.info("GET1: Resuming after pm=%d, PSORT1=%r", self.pm, self.psort1)
+    
+    def resume_from_checkpoint(self) -> bool:
+        """
+        Restore from checkpoint_path if a checkpoint exists.
+        
+        Returns:
+            True if the processor was positioned at a checkpoint
+        """
+        state = read_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        if state is None:
+            return False
+        self.restore_state(state)
+        return True
     
     def reset(self) -> None:
-        """Reset the processor state for reprocessing."""
+        """
+        Reset the processor state for reprocessing.
+        
+        Raises:
+            MasterRecordException: If MM77 was supplied as a one-shot iterator
+                                   (e.g. a generator) that cannot be rewound
+        """
+        if not self.is_rewindable:
+            raise MasterRecordException(
+                "Cannot reset: MM77 source is a one-shot iterator and cannot be rewound"
+            )
+        self._records = iter(self.mm77_records)
         self.pm = -1
         self.psort1 = None
         self.isort1 = None
         self.eof_reached = False
+        self._next_progress = self.progress_interval
+        self._started_at = None
+        self._resume_pm = -1
+        self.rows_read = self.parents_skipped = self.missing_meid = 0
         logger.info("GET1: Processor reset")
 
 
 # Example usage and test cases
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Example master records
     test_records = [
         {'M100': 'D', 'M101': 'A001', 'NAME': 'Merchant A'},
@@ -247,14 +720,14 @@ if __name__ == "__main__":
         print("\n" + "=" * 60)
         print("RESULTS")
         print("=" * 60)
-        print(f"Total records processed: {{len(valid_records)}}")
-        print(f"Final PSORT1: {{processor.psort1}}")
-        print(f"EOF reached: {{processor.eof_reached}}")
+        print(f"Total records processed: {len(valid_records)}")
+        print(f"Final PSORT1: {processor.psort1}")
+        print(f"EOF reached: {processor.eof_reached}")
         
         print("\nValid records:")
         for i, record in enumerate(valid_records, 1):
-            print(f"  {{i}}. {{record}}")
+            print(f"  {i}. {record}")
     
     except SequenceError as e:
-        print(f"\nERROR: {{str(e)}}")
+        print(f"\nERROR: {str(e)}")
         print("ACTION: Please restart after fixing the sequence error")
@@ -0,0 +1,170 @@
+"""
+GET1 SHARDED - PARALLEL GET NEXT RECORD OVER MM77 ROW RANGES
+Splits MM77 into contiguous row ranges that are scanned by a process pool.
+
+Each worker bypasses parent records, forms ISORT1 and validates the sequence
+inside its own range. The parent process then stitches the shards back in
+order, comparing the first key of each shard with the last key of the one
+before it, so the result and any SequenceError (message and pm) are the same
+as a serial MasterRecordProcessor.process_all_records() run.
+"""
+
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from get1_master_record import (
+    MasterRecordProcessor, SequenceError, eof_key_after, sequence_error_message,
+)
+from mm77_reader import DEFAULT_MM77_LAYOUT, MM77FileReader, MM77Layout
+
+logger = logging.getLogger(__name__)
+
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+Key = Union[str, bytes]
+
+
+class ShardResult:
+    """
+    Outcome of scanning one MM77 row range.
+
+    Attributes:
+        records: Valid records in the range, up to any break or EOF marker
+        first_pm / first_key: Position and ISORT1 of the first valid record
+        last_key: ISORT1 of the last valid record
+        error: (pm, ISORT1, PSORT1) of the first in-shard sequence break
+        eof_pm: Position of a "Z" EOF marker within the range
+    """
+
+    __slots__ = ('records', 'first_pm', 'first_key', 'last_key', 'error', 'eof_pm')
+
+    def __init__(self):
+        self.records: List = []
+        self.first_pm: Optional[int] = None
+        self.first_key: Optional[Key] = None
+        self.last_key: Optional[Key] = None
+        self.error: Optional[Tuple[int, Key, Key]] = None
+        self.eof_pm: Optional[int] = None
+
+
+def _scan_shard(source: Union[str, Sequence], start: int, stop: int,
+                layout: MM77Layout, record_separator: bytes) -> ShardResult:
+    """Worker: apply the GET1 rules to rows [start, stop) of MM77."""
+    result = ShardResult()
+    form_isort1 = MasterRecordProcessor(())._form_isort1
+    reader = None
+    if isinstance(source, str):
+        reader = MM77FileReader(source, layout, record_separator)
+        rows = islice(reader.iter_from(start), stop - start)
+    else:
+        rows = source
+
+    try:
+        last_key = None
+        for pm, record in enumerate(rows, start):
+            meid = record.get('M101', '')
+            if not meid:
+                logger.warning("GET1: Record at pm=%d missing M101 (MEID) field", pm)
+                continue
+            if str(meid)[0] == "Z":
+                result.eof_pm = pm
+                break
+            if record.get('M100', '') == "P":
+                continue
+            key = form_isort1(record)
+            if last_key is None:
+                result.first_pm, result.first_key = pm, key
+            elif key <= last_key:
+                result.error = (pm, key, last_key)
+                break
+            last_key = key
+            # Views point into the worker's mapping; ship plain dicts back
+            result.records.append(record.to_dict() if reader is not None else record)
+        result.last_key = last_key
+    finally:
+        if reader is not None:
+            reader.close()
+    return result
+
+
+def process_all_records_sharded(mm77: Union[str, Sequence[Dict]], workers: Optional[int] = None,
+                                shard_size: Optional[int] = None,
+                                layout: MM77Layout = DEFAULT_MM77_LAYOUT,
+                                record_separator: bytes = b'\n') -> List[Dict]:
+    """
+    Sharded, multi-process equivalent of MasterRecordProcessor.process_all_records().
+
+    Args:
+        mm77: Path to a fixed-width MM77 file, or a sequence of record dicts
+        workers: Worker processes (default: CPU count); 1 runs in-process
+        shard_size: Rows per shard (default: spread over SHARDS_PER_WORKER per worker)
+        layout: Field layout when mm77 is a file path
+        record_separator: Record separator when mm77 is a file path
+
+    Returns:
+        List of all valid records (dicts, also for file input)
+
+    Raises:
+        SequenceError: With the same message and pm as the serial processor
+    """
+    workers = workers or os.cpu_count() or 1
+    if isinstance(mm77, str):
+        with MM77FileReader(mm77, layout, record_separator) as reader:
+            total = len(reader)
+    else:
+        total = len(mm77)
+    shard_size = shard_size or max(1, math.ceil(total / (workers * SHARDS_PER_WORKER)))
+    bounds = [(start, min(start + shard_size, total)) for start in range(0, total, shard_size)]
+
+    def shard_source(start, stop):
+        return mm77 if isinstance(mm77, str) else mm77[start:stop]
+
+    tasks = [(shard_source(start, stop), start, stop, layout, record_separator)
+             for start, stop in bounds]
+    if workers == 1:
+        return _stitch((_scan_shard(*task) for task in tasks), total)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_scan_shard, *task) for task in tasks]
+        try:
+            return _stitch((future.result() for future in futures), total)
+        finally:
+            # Shards past an error or EOF marker are not needed
+            for future in futures:
+                future.cancel()
+
+
+def _stitch(shards, total: int) -> List[Dict]:
+    """Join shard results in MM77 order, checking the boundary keys."""
+    valid_records: List[Dict] = []
+    previous_key = None
+    eof_pm = total  # Physical end of MM77 unless a "Z" marker comes first
+    for shard in shards:
+        if shard.first_key is not None and previous_key is not None \
+                and shard.first_key <= previous_key:
+            _raise_sequence_error(shard.first_pm, shard.first_key, previous_key)
+        if shard.error is not None:
+            _raise_sequence_error(*shard.error)
+        valid_records.extend(shard.records)
+        if shard.last_key is not None:
+            previous_key = shard.last_key
+        if shard.eof_pm is not None:
+            eof_pm = shard.eof_pm
+            break
+
+    # The serial processor also validates the EOF key against the last PSORT1
+    if previous_key is not None:
+        eof_key = eof_key_after(previous_key)
+        if eof_key <= previous_key:
+            _raise_sequence_error(eof_pm, eof_key, previous_key)
+    logger.info("GET1: Sharded processing complete - %d valid records", len(valid_records))
+    return valid_records
+
+
+def _raise_sequence_error(pm: Optional[int], isort1: Key, psort1: Key) -> None:
+    logger.error("GET1: Sequence error at pm=%s", pm)
+    raise SequenceError(sequence_error_message(isort1, psort1), pm=pm)
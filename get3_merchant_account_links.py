@@ -5,30 +5,224 @@ Comprehensive implementation for MA78 (Merchant Account Links) processing
 including all field mappings and sequence validation for GET3.
 '''
 
-def process_merchant_account_links(data):
-    # Validate the data structure
-    required_fields = ['field1', 'field2', 'field3']  # Example fields
-    for field in required_fields:
-        if field not in data:
-            raise ValueError(f'Missing required field: {field}')
-
-    # Field mappings for GET3 MA78
-    field_mappings = {
-        'field1': 'mappedField1',
-        'field2': 'mappedField2',
-        'field3': 'mappedField3',
-    }
+from functools import partial
+from operator import itemgetter
+
+from instrumentation import registry
+
+# Declared MA78 layout: (source field, mapped field) in record sequence
+MA78_LAYOUT = (
+    ('field1', 'mappedField1'),
+    ('field2', 'mappedField2'),
+    ('field3', 'mappedField3'),
+)
+
+
+class MA78MappingPlan:
+    '''
+    Mapping and validation plan compiled once from an MA78 layout, so the
+    field lists, mappings and getters are not rebuilt for every record.
+    '''
+
+    def __init__(self, layout=MA78_LAYOUT):
+        if not layout:
+            raise ValueError('MA78 layout must declare at least one field')
+        self.source_fields = tuple(source for source, _ in layout)
+        self.mapped_fields = tuple(mapped for _, mapped in layout)
+        getter = itemgetter(*self.source_fields)
+        # itemgetter returns a bare value rather than a tuple for one field
+        self._get_values = getter if len(layout) > 1 else (lambda data: (getter(data),))
+
+    def validate(self, data):
+        '''Return every validation failure for one record (empty if valid).'''
+        return [f'Missing required field: {field}'
+                for field in self.source_fields if field not in data]
+
+    def apply(self, data):
+        '''Map one record, raising ValueError on the first missing field.'''
+        try:
+            return dict(zip(self.mapped_fields, self._get_values(data)))
+        except KeyError:
+            raise ValueError(self.validate(data)[0]) from None
+
+
+class MA78BatchProcessor:
+    '''
+    Batch GET3: applies a compiled MA78MappingPlan to a stream of link
+    records. Mapped records are yielded as they are produced; records that
+    fail validation are skipped and their failures collected in
+    self.failures as (position, record, [messages]).
+    '''
+
+    def __init__(self, plan=None):
+        self.plan = plan if plan is not None else MA78MappingPlan()
+        self.failures = []
+
+    def process(self, records):
+        get_values = self.plan._get_values
+        mapped_fields = self.plan.mapped_fields
+        failures = self.failures
+        failures_before = len(failures)
+        records_in = 0
+
+        def map_record(position, data):
+            try:
+                values = get_values(data)
+            except KeyError:
+                failures.append((position, data, self.plan.validate(data)))
+                return None
+            return dict(zip(mapped_fields, values))
+
+        # Timed around each mapping only: the consumer's time between records is not GET3's
+        call = registry.open_stage('get3') if registry.enabled else None
+        try:
+            for records_in, data in enumerate(records, 1):
+                if call is None:
+                    mapped = map_record(records_in - 1, data)
+                else:
+                    with call:
+                        mapped = map_record(records_in - 1, data)
+                if mapped is not None:
+                    yield mapped
+        finally:
+            if call is not None:
+                call.close()
+                failed = len(failures) - failures_before
+                registry.count('get3.records_in', records_in)
+                registry.count('get3.records_out', records_in - failed)
+                registry.count('get3.records_failed', failed)
+
+
+# MA78 field carrying the owning MEID (matches MM77 M101)
+MA78_KEY_FIELD = 'M101'
+
 
-    # Sequence validation 
-    sequence = ['field1', 'field2', 'field3']
-    for index, field in enumerate(sequence):
-        if field not in data:
-            raise ValueError(f'Field {field} is not in the correct sequence.')
+def ma78_isort1(data, key_field=MA78_KEY_FIELD, layout=None):
+    '''
+    ISORT1 of a link record, formed as GET1 forms the master key: a padded
+    str as MasterRecordProcessor._form_isort1 does for dict records, or with
+    the mm77_reader.MM77Layout of a fixed-width MM77 file, the bytes
+    MM77RecordView.isort1_key() slices for the same MEID.
 
-    # Processing Logic
-    # Here we will implement the actual logic to process the merchant account links
-    processed_data = {field_mappings[field]: data[field] for field in required_fields}
-    return processed_data
+    Raises:
+        KeyError: If the record has no key_field
+        TypeError: If the key is not a str
+        ValueError: If the key does not fit the layout (its ISORT1 has
+                    other fields, or the key does not encode)
+    '''
+    value = data[key_field]
+    if not isinstance(value, str):
+        raise TypeError(f'{key_field} must be a str, not {type(value).__name__}')
+    if layout is None:
+        return value.ljust(10, ' ')
+    return layout.encode_isort1((value,))
+
+
+def ma78_link_key(processor, key_field=MA78_KEY_FIELD):
+    '''
+    Link key function whose keys compare with processor.isort1: bytes in
+    the layout's encoding when GET1 reads a fixed-width MM77FileReader,
+    str otherwise.
+    '''
+    layout = getattr(processor.mm77_records, 'layout', None)
+    return partial(ma78_isort1, key_field=key_field, layout=layout)
+
+
+class MA78MergeJoin:
+    '''
+    GET3 sequence validation: merge-joins MA78 link records, streamed in
+    ISORT1 order, against the GET1 master stream in a single linear pass.
+
+    join() yields (master_record, [links]) for every valid master record.
+    Links whose key has no master record are collected in
+    self.orphan_links, links whose key is lower than the previous link's in
+    self.out_of_sequence_links, and links without a key field in
+    self.failures; all as (position, record) or (position, record, [messages]).
+    '''
+
+    def __init__(self, key_field=MA78_KEY_FIELD, link_key=None):
+        self.key_field = key_field
+        # None: ma78_link_key() of the processor passed to join()
+        self.link_key = link_key
+        self.orphan_links = []
+        self.out_of_sequence_links = []
+        self.failures = []
+
+    def join(self, processor, ma78_records):
+        '''
+        Args:
+            processor: GET1 MasterRecordProcessor; its ISORT1 is the join key
+            ma78_records: Iterable of MA78 link records in ISORT1 order
+        '''
+        link_key = self.link_key if self.link_key is not None else ma78_link_key(
+            processor, self.key_field)
+        links = self._ordered_links(ma78_records, link_key)
+        pending = next(links, None)
+        for master in processor.iter_valid_records():
+            master_key = processor.isort1
+            attached = []
+            while pending is not None and pending[0] <= master_key:
+                link_key, position, link = pending
+                if link_key == master_key:
+                    attached.append(link)
+                else:
+                    self.orphan_links.append((position, link))
+                pending = next(links, None)
+            yield master, attached
+
+        # Links beyond the last master record have nothing to join to
+        while pending is not None:
+            self.orphan_links.append(pending[1:])
+            pending = next(links, None)
+
+    def _ordered_links(self, ma78_records, key):
+        '''Yield (key, position, record), diverting unkeyed or out-of-sequence links.'''
+        previous_key = None
+        for position, link in enumerate(ma78_records):
+            try:
+                link_key = key(link)
+            except KeyError:
+                self.failures.append((position, link, [f'Missing required field: {self.key_field}']))
+                continue
+            except (TypeError, ValueError) as e:
+                self.failures.append((position, link, [f'Invalid {self.key_field}: {e}']))
+                continue
+            if previous_key is not None and link_key < previous_key:
+                self.out_of_sequence_links.append((position, link))
+                continue
+            previous_key = link_key
+            yield link_key, position, link
+
+
+def lookup_link_masters(ma78_records, mm77_lookup, key_field=MA78_KEY_FIELD):
+    '''
+    Pair MA78 link records with their MM77 master record by MEID, in any
+    order, using a keyed lookup such as mm77_lookup.MM77LookupStore.
+
+    Yields (link, master) where master is None for a link without a key
+    field or whose MEID is not in MM77.
+    '''
+    for link in ma78_records:
+        meid = link.get(key_field)
+        yield link, (mm77_lookup.get(meid) if meid else None)
+
+
+_DEFAULT_PLAN = MA78MappingPlan()
+
+
+def process_merchant_account_links(data):
+    # Validate the data structure and apply the GET3 MA78 field mappings
+    if not registry.enabled:
+        return _DEFAULT_PLAN.apply(data)
+    registry.count('get3.records_in')
+    with registry.stage('get3'):
+        try:
+            mapped = _DEFAULT_PLAN.apply(data)
+        except ValueError:
+            registry.count('get3.records_failed')
+            raise
+    registry.count('get3.records_out')
+    return mapped
 
 # Example usage
 if __name__ == '__main__':
@@ -41,4 +235,4 @@ if __name__ == '__main__':
         result = process_merchant_account_links(sample_data)
         print('Processed Data:', result)
     except ValueError as e:
-        print('Error:', e)
\ No newline at end of file
+        print('Error:', e)
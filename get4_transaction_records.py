@@ -1,61 +1,501 @@
-import requests
+import codecs
+import heapq
+import json
 import logging
+import pickle
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as Date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from operator import attrgetter
+
+from instrumentation import registry
+
+# requests is imported where it is used: it is slow to import and only the
+# fetch paths need it, so batch workers that just process or sort records
+# never pay for it
+
+# Library module: logging is configured by the caller (see __main__ below)
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the upstream to connect / send data before giving up
+DEFAULT_TIMEOUT = (5, 30)
+
+# Paged fetcher defaults
+DEFAULT_PAGE_SIZE = 10_000
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+# Bytes read per chunk by the streaming JSON decoder
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Characters of a JSON array element the streaming decoder holds while it
+# waits for the rest of it; malformed input fails instead of being buffered
+DEFAULT_MAX_ELEMENT_SIZE = 16 * 1024 * 1024
+
+# Characters that can continue a JSON number
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+# Sort order when sort_records() is given no key
+DEFAULT_SORT_KEY = ('date', 'amount', 'record_id')
+
+# Approximate bytes of records held in memory per external-sort run
+DEFAULT_SORT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def parse_amount(amount):
+    """Parse a JSON amount (int, float or numeric string) to an exact Decimal."""
+    if isinstance(amount, int) and not isinstance(amount, bool):
+        return Decimal(amount)
+    try:
+        value = Decimal(str(amount).strip())
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite():
+        raise ValueError(f'Invalid amount: {amount!r}')
+    return value
+
+
+def parse_date(date):
+    """Parse an ISO 'YYYY-MM-DD' date (optionally with a time part) to a date ordinal."""
+    try:
+        return Date.fromisoformat(str(date)[:10]).toordinal()
+    except ValueError:
+        raise ValueError(f'Invalid date: {date!r}') from None
+
+
+# Sort key of an amount or date that does not parse: after every parsed value
+UNPARSEABLE_KEY = float('inf')
+
+# Decimal places in one major currency unit; amount keys are in these minor units
+AMOUNT_MINOR_DIGITS = 2
+
+
+def amount_key(amount):
+    """
+    Sort key of an amount: integer minor units (cents), or a Decimal of minor
+    units when the amount is finer than that (ints and Decimals compare
+    exactly, so 10.001 still sorts before 10.004).
+    """
+    try:
+        minor = parse_amount(amount).scaleb(AMOUNT_MINOR_DIGITS)
+    except ValueError:
+        return UNPARSEABLE_KEY
+    integral = int(minor)
+    return integral if integral == minor else minor
+
+
+def date_key(date):
+    """Sort key of a date: its ordinal."""
+    try:
+        return parse_date(date)
+    except ValueError:
+        return UNPARSEABLE_KEY
+
+
+# A batch spans few distinct dates: parse each once and share the key object
+_cached_date_key = lru_cache(maxsize=4096)(date_key)
+
+
+# Sort key names served by the precomputed key slots
+SORT_KEY_ATTRS = {'amount': 'amount_key', 'date': 'date_key'}
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, filename='get4_transaction_records.log',
-                    format='%(asctime)s - %(levelname)s - %(message)s')
 
 class TransactionRecord:
+    # No per-instance __dict__: keeps large transaction batches compact.
+    # The sort keys are normalized once here, not on every sort or merge.
+    __slots__ = ('record_id', 'amount', 'date', 'amount_key', 'date_key')
+
     def __init__(self, record_id, amount, date):
         self.record_id = record_id
         self.amount = amount
         self.date = date
+        if type(amount) is int:
+            self.amount_key = amount * 10 ** AMOUNT_MINOR_DIGITS
+        else:
+            self.amount_key = amount_key(amount)
+        try:
+            self.date_key = _cached_date_key(date)
+        except TypeError:  # Unhashable JSON value
+            self.date_key = date_key(date)
 
     def __repr__(self):
         return f'TransactionRecord(record_id={self.record_id}, amount={self.amount}, date={self.date})'
 
 
-def fetch_transaction_records(api_url):
-    logging.info('Fetching transaction records from API')
+def fetch_transaction_records(api_url, timeout=DEFAULT_TIMEOUT):
+    import requests
+    logger.info('Fetching transaction records from API')
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise an error for bad responses
-        logging.info('Fetched transaction records successfully')
+        with registry.stage('get4.fetch'):
+            response = requests.get(api_url, timeout=timeout)
+            response.raise_for_status()  # Raise an error for bad responses
+        if registry.enabled:
+            registry.count('get4.bytes_read', len(response.content))
+        logger.info('Fetched transaction records successfully')
         return response.json()
     except requests.exceptions.RequestException as e:
-        logging.error(f'Error fetching transaction records: {e}')
+        logger.error('Error fetching transaction records: %s', e)
         return None
 
 
-def process_records(records):
-    transaction_records = []
-    logging.info('Processing transaction records')
-    for record in records:
+def iter_pages_in_order(fetch_page, page_size, executor, window):
+    """
+    Yield the non-empty pages 1, 2, ... of a paged source in page order,
+    keeping up to ``window`` fetch_page calls in flight on ``executor``.
+    The first page shorter than page_size is the last.
+    """
+    in_flight = deque()
+    next_page = 1
+    try:
+        while True:
+            while len(in_flight) < window:
+                in_flight.append(executor.submit(fetch_page, next_page))
+                next_page += 1
+            records = in_flight.popleft().result()
+            if records:
+                yield records
+            if len(records) < page_size:
+                break
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+class TransactionPageFetcher:
+    """
+    Pooled, paginated, concurrent GET4 fetcher.
+
+    Pages are requested as ``api_url?page=N&page_size=M`` (N from 1) over a
+    pooled requests.Session, at most ``max_workers`` at a time. Each page is
+    expected to be a JSON array; the first page shorter than page_size marks
+    the end. Every request has a timeout and is retried with exponential
+    backoff on connection errors, timeouts and RETRY_STATUSES.
+
+    Usage:
+        with TransactionPageFetcher(API_URL) as fetcher:
+            for transactions in fetcher.iter_processed_pages():
+                ...
+    """
+
+    def __init__(self, api_url, page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_MAX_WORKERS,
+                 timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.api_url = api_url
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch_page(self, page):
+        """Fetch and decode one page, retrying transient failures."""
+        import requests
+        params = {'page': page, 'page_size': self.page_size}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    if registry.enabled:
+                        registry.count('get4.pages')
+                        registry.count('get4.bytes_read', len(response.content))
+                    return response.json()
+                error = requests.exceptions.HTTPError(
+                    f'{response.status_code} for page {page}', response=response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            if attempt < self.max_retries:
+                delay = self.backoff * (2 ** attempt)
+                logger.warning('Retrying page %s in %.2fs after error: %s', page, delay, error)
+                time.sleep(delay)
+        logger.error('Error fetching transaction page %s: %s', page, error)
+        raise error
+
+    def iter_pages(self):
+        """Yield decoded pages in page order while later pages are in flight."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from iter_pages_in_order(self.fetch_page, self.page_size, executor,
+                                           self.max_workers)
+
+    def iter_processed_pages(self):
+        """Yield each page as a list of TransactionRecord objects."""
+        logger.info('Fetching transaction records from API page by page')
+        for records in self.iter_pages():
+            yield process_records(records)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_process_records(records, strict=False):
+    """
+    Yield a TransactionRecord per record. Records missing a key are skipped.
+    With strict=True, records whose amount or date does not parse are
+    skipped too and counted as get4.records_invalid; by default they are
+    kept, and sort after the parseable values.
+    """
+    # Resolve the DEBUG check once per batch rather than once per record
+    debug = logger.isEnabledFor(logging.DEBUG)
+    records_in = records_out = invalid = 0
+    try:
+        for records_in, record in enumerate(records, 1):
+            try:
+                transaction = TransactionRecord(record['id'], record['amount'], record['date'])
+            except KeyError as e:
+                logger.error('Missing key in record: %s', e)
+                continue
+            if strict and (transaction.amount_key is UNPARSEABLE_KEY
+                           or transaction.date_key is UNPARSEABLE_KEY):
+                logger.error('Invalid record %s: amount %r, date %r', transaction.record_id,
+                             transaction.amount, transaction.date)
+                invalid += 1
+                continue
+            if debug:
+                logger.debug('Processed record: %r', transaction)
+            records_out += 1
+            yield transaction
+    finally:
+        if registry.enabled:
+            registry.count('get4.records_in', records_in)
+            registry.count('get4.records_out', records_out)
+            registry.count('get4.records_skipped', records_in - records_out)
+            if invalid:
+                registry.count('get4.records_invalid', invalid)
+
+
+def process_records(records, strict=False):
+    logger.info('Processing transaction records')
+    with registry.stage('get4.process'):
+        return list(iter_process_records(records, strict))
+
+
+def iter_json_array(chunks, max_element_size=DEFAULT_MAX_ELEMENT_SIZE):
+    """
+    Incrementally decode a top-level JSON array from an iterable of byte
+    chunks, yielding each element as soon as it is complete. Only the
+    unconsumed tail of the input is buffered, so memory is bounded by the
+    chunk size plus the largest single element, not the payload size.
+    An element that is still incomplete after max_element_size characters
+    raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer, pos, eof = '', 0, False
+    # '[' before the array, 'first'/'value' before an element, 'after' after one
+    state = '['
+
+    def more():
+        # Append the next chunk, dropping the consumed prefix
+        nonlocal buffer, pos, eof
+        if len(buffer) - pos > max_element_size:
+            raise ValueError('Malformed JSON array element, or one larger than '
+                             f'{max_element_size} characters, in transaction payload')
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('Truncated JSON array in transaction payload')
+            more()
+            continue
+
+        char = buffer[pos]
+        if state == '[':
+            if char != '[':
+                raise ValueError('Transaction payload is not a JSON array')
+            pos += 1
+            state = 'first'
+            continue
+        if char == ']' and state in ('first', 'after'):
+            return
+        if state == 'after':
+            if char != ',':
+                raise ValueError(f'Expected "," in JSON array, found {char!r}')
+            pos += 1
+            state = 'value'
+            continue
+
         try:
-            transaction = TransactionRecord(record['id'], record['amount'], record['date'])
-            transaction_records.append(transaction)
-            logging.debug(f'Processed record: {transaction}')
-        except KeyError as e:
-            logging.error(f'Missing key in record: {e}')
-    return transaction_records
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more()
+            continue
+        if not eof:
+            # A number may continue in the next chunk: '12.' decodes as 12
+            # with '.' left over, '1' in '1e3' as 1. Read on while the
+            # element runs to the end of the buffer
+            tail = end
+            while tail < len(buffer) and buffer[tail] in _NUMBER_CHARS:
+                tail += 1
+            if tail == len(buffer):
+                more()
+                continue
+        pos = end
+        state = 'after'
+        yield element
+
+
+def iter_file_chunks(path, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        chunks = iter(lambda: f.read(chunk_size), b'')
+        if registry.enabled:
+            chunks = registry.count_bytes(chunks, 'get4.bytes_read')
+        yield from chunks
+
+
+def stream_transaction_records_from_file(path, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, strict=False):
+    """Yield TransactionRecord objects from a local JSON-array dump."""
+    logger.info('Streaming transaction records from %s', path)
+    yield from iter_process_records(iter_json_array(iter_file_chunks(path, chunk_size)), strict)
 
 
-def sort_records(records, key_attr):
-    logging.info(f'Sorting records by {key_attr}')
+def stream_transaction_records(api_url, timeout=DEFAULT_TIMEOUT,
+                               chunk_size=DEFAULT_STREAM_CHUNK_SIZE, strict=False):
+    """Yield TransactionRecord objects while the HTTP body is still arriving."""
+    import requests
+    logger.info('Streaming transaction records from API')
+    with requests.get(api_url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=chunk_size)
+        if registry.enabled:
+            chunks = registry.count_bytes(chunks, 'get4.bytes_read')
+        yield from iter_process_records(iter_json_array(chunks), strict)
+
+
+def _sort_key(key_attr):
+    # key_attr is one attribute name or a sequence of names for a compound key;
+    # amount and date sort on their precomputed keys, so the key function is
+    # a plain C-level attrgetter
+    if isinstance(key_attr, str):
+        return attrgetter(SORT_KEY_ATTRS.get(key_attr, key_attr))
+    return attrgetter(*[SORT_KEY_ATTRS.get(name, name) for name in key_attr])
+
+
+def sort_records(records, key_attr=DEFAULT_SORT_KEY):
+    logger.info('Sorting records by %s', key_attr)
     try:
-        sorted_records = sorted(records, key=lambda x: getattr(x, key_attr))
-        logging.info('Records sorted successfully')
+        with registry.stage('get4.sort'):
+            sorted_records = sorted(records, key=_sort_key(key_attr))
+        logger.info('Records sorted successfully')
         return sorted_records
     except AttributeError as e:
-        logging.error(f'Error sorting records: {e}')
+        logger.error('Error sorting records: %s', e)
         return records
 
 
+def _record_size(record):
+    # Shallow size of the record plus its attribute values
+    return sys.getsizeof(record) + sum(
+        sys.getsizeof(getattr(record, name)) for name in TransactionRecord.__slots__)
+
+
+def _spill_run(run, temp_dir):
+    run_file = tempfile.TemporaryFile(dir=temp_dir)
+    pickler = pickle.Pickler(run_file, protocol=pickle.HIGHEST_PROTOCOL)
+    for record in run:
+        pickler.dump(record)
+        # Records are independent; don't let the memo pin every one of them
+        pickler.clear_memo()
+    run_file.seek(0)
+    return run_file
+
+
+def _read_run(run_file):
+    unpickler = pickle.Unpickler(run_file)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
+
+
+def external_sort_records(records, key_attr, memory_budget=DEFAULT_SORT_MEMORY_BUDGET,
+                          temp_dir=None):
+    """
+    Sort a stream of TransactionRecord objects that may not fit in memory.
+
+    Records are gathered into runs of roughly memory_budget bytes; each run is
+    sorted and spilled to a temporary file, then the runs are k-way merged with
+    a heap. Runs are merged in input order and ties keep that order, so the
+    output is identical to sort_records(). Input that fits in one run is
+    sorted in memory without touching disk.
+
+    Args:
+        records: Iterable of TransactionRecord objects
+        key_attr: 'amount', 'date', 'record_id', or a sequence of them
+        memory_budget: Approximate bytes of records held per run
+        temp_dir: Directory for spilled runs (system default if None)
+
+    Yields:
+        TransactionRecord objects in sorted order
+    """
+    logger.info('External sort of records by %s, budget %d bytes', key_attr, memory_budget)
+    key = _sort_key(key_attr)
+    run_files = []
+    run, run_bytes = [], 0
+    try:
+        for record in records:
+            run.append(record)
+            run_bytes += _record_size(record)
+            if run_bytes >= memory_budget:
+                run.sort(key=key)
+                run_files.append(_spill_run(run, temp_dir))
+                run, run_bytes = [], 0
+
+        run.sort(key=key)
+        if not run_files:
+            yield from run
+            return
+        if run:
+            run_files.append(_spill_run(run, temp_dir))
+            run = []
+        if registry.enabled:
+            registry.count('get4.sort_runs_spilled', len(run_files))
+        logger.info('Merging %d sorted runs', len(run_files))
+        yield from heapq.merge(*(_read_run(run_file) for run_file in run_files), key=key)
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG, filename='get4_transaction_records.log',
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
     API_URL = 'https://api.example.com/get4/transactions'
     records_data = fetch_transaction_records(API_URL)
     if records_data:
         processed_records = process_records(records_data)
         sorted_records = sort_records(processed_records, 'amount')
-        logging.info(f'Sorted Transaction Records: {sorted_records}')
+        logger.info('Sorted Transaction Records: %s', sorted_records)
         # Further processing or exporting of sorted records can be done here
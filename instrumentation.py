@@ -0,0 +1,269 @@
+"""
+INSTRUMENTATION
+Per-stage counters and timers for the GET1-GET4 nightly run.
+
+The GET modules feed the shared ``registry`` with records in/out, records
+skipped, bytes read and time per stage. The registry is disabled by default;
+instrumented code checks ``registry.enabled`` once per call (not per record),
+so a disabled registry costs one attribute lookup per stage call.
+
+Optional hooks, set when enabling:
+    profile_dir   Stage calls run under cProfile. Each stage has one profile
+                  that accumulates over all its calls and is written to
+                  <profile_dir>/<stage>.prof after every call
+    trace_memory  Each stage records the most tracemalloc-traced memory it
+                  grew by during any of its segments, in bytes
+
+Stages that are generators (the GET1 scan, GET3 batch mapping) use
+open_stage() and enter the returned StageCall around each step, so the
+time their consumer spends between steps is not charged to the stage.
+Profilers are switched at segment boundaries: a stage entered inside
+another's segment profiles into its own file, and the outer profile
+resumes when it exits. tracemalloc's peak is process-wide, so it is folded
+into every open segment whenever one opens or closes, then reset.
+
+Usage:
+    from instrumentation import registry
+    registry.enable()
+    loop.on_end_of_job(lambda summary: registry.dump_json('nightly_metrics.json'))
+    loop.run()
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, Optional
+
+_DISABLED_STAGE = nullcontext()
+
+
+class InstrumentationRegistry:
+    """
+    Counters and timers keyed by dotted names such as 'get1.records_in'.
+
+    Attributes:
+        enabled: Whether instrumented code should record anything
+        counters: Mapping of counter name to total
+        timers: Mapping of timer name to [calls, seconds]
+        memory_peaks: Mapping of stage name to tracemalloc peak bytes
+        profiles: Mapping of stage name to the .prof file written for it
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profile_dir: Optional[str] = None
+        self.trace_memory = False
+        self._started_tracemalloc = False
+        # Per-thread stack of the profilers of the open segments
+        self._local = threading.local()
+        # GET4 pages are fetched on worker threads
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, profile_dir: Optional[str] = None, trace_memory: bool = False) -> None:
+        """Start recording, optionally with cProfile and tracemalloc hooks."""
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording; stops tracemalloc if a stage started it."""
+        self.enabled = False
+        if self._started_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """Discard everything recorded so far."""
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, list] = {}
+        self.memory_peaks: Dict[str, int] = {}
+        self.profiles: Dict[str, str] = {}
+        self._profilers: Dict[str, object] = {}
+        # Stages whose profiler is enabled on some thread: cProfile is not
+        # thread-safe, so one profiler runs on one thread at a time
+        self._profilers_busy = set()
+        self._segments = set()
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += calls
+            timer[1] += seconds
+
+    def count_bytes(self, chunks: Iterable[bytes], name: str) -> Iterator[bytes]:
+        """Pass chunks through, adding their total length to the counter ``name``."""
+        total = 0
+        try:
+            for chunk in chunks:
+                total += len(chunk)
+                yield chunk
+        finally:
+            self.count(name, total)
+
+    def stage(self, name: str):
+        """
+        Context manager timing one stage call under the timer ``name``.
+
+        Returns a shared no-op context when the registry is disabled.
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        call = self.open_stage(name)
+        try:
+            with call:
+                yield
+        finally:
+            call.close()
+
+    def open_stage(self, name: str) -> 'StageCall':
+        """
+        Start one call of stage ``name`` that runs in several segments; the
+        caller enters it around each segment and closes it at the end.
+        Only call this while the registry is enabled.
+        """
+        return StageCall(self, name)
+
+    def _push_profiler(self, name: str):
+        # Pause the enclosing segment's profiler so each profile only holds
+        # its own stage; None if this stage's profiler is busy elsewhere
+        with self._lock:
+            if name in self._profilers_busy:
+                return None
+            self._profilers_busy.add(name)
+            profiler = self._profilers.get(name)
+            if profiler is None:
+                # Imported here, not at module level: only an enabled registry needs it
+                import cProfile
+                profiler = self._profilers[name] = cProfile.Profile()
+        stack = self._local.__dict__.setdefault('profilers', [])
+        if stack:
+            stack[-1].disable()
+        stack.append(profiler)
+        profiler.enable()
+        return profiler
+
+    def _pop_profiler(self, name: str, profiler) -> None:
+        profiler.disable()
+        stack = self._local.profilers
+        stack.pop()
+        with self._lock:
+            self._profilers_busy.discard(name)
+        if stack:
+            stack[-1].enable()
+
+    def _dump_profile(self, name: str) -> None:
+        # The profile holds every call of the stage so far, so the file is
+        # complete; a call still running on another thread dumps it later
+        path = os.path.join(self.profile_dir, f'{name}.prof')
+        with self._lock:
+            if name not in self._profilers_busy:
+                self._profilers[name].dump_stats(path)
+                self.profiles[name] = path
+
+    def _fold_peak(self) -> int:
+        # Called under the lock. Every open segment was open for the whole
+        # time since the last reset, so the peak counts for all of them
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        for segment in self._segments:
+            segment.peak = max(segment.peak, peak - segment._base)
+        tracemalloc.reset_peak()
+        return current
+
+    def _open_segment(self, call: 'StageCall') -> None:
+        with self._lock:
+            call._base = self._fold_peak()
+            self._segments.add(call)
+
+    def _close_segment(self, call: 'StageCall') -> None:
+        with self._lock:
+            self._fold_peak()
+            self._segments.discard(call)
+
+    def _record_peak(self, name: str, peak: int) -> None:
+        with self._lock:
+            self.memory_peaks[name] = max(self.memory_peaks.get(name, 0), peak)
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far, as plain JSON-serialisable data."""
+        return {
+            'counters': dict(self.counters),
+            'timers': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in self.timers.items()},
+            'memory_peaks': dict(self.memory_peaks),
+            'profiles': dict(self.profiles),
+        }
+
+    def dump_json(self, path: str) -> None:
+        """Write snapshot() to path, e.g. from an end-of-job handler."""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True)
+
+
+class StageCall:
+    """
+    One call of a stage, timed (and, with the registry's hooks, profiled and
+    memory-traced) over one or more ``with`` segments until close().
+    """
+
+    __slots__ = ('registry', 'name', 'seconds', 'peak', 'profiled', '_profiler', '_base',
+                 '_started')
+
+    def __init__(self, registry: InstrumentationRegistry, name: str):
+        self.registry = registry
+        self.name = name
+        self.seconds = 0.0
+        self.peak = 0
+        self.profiled = False
+        self._profiler = None
+        if registry.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                registry._started_tracemalloc = True
+
+    def __enter__(self) -> 'StageCall':
+        registry = self.registry
+        if registry.trace_memory:
+            registry._open_segment(self)
+        if registry.profile_dir is not None:
+            self._profiler = registry._push_profiler(self.name)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.seconds += time.perf_counter() - self._started
+        registry = self.registry
+        if self._profiler is not None:
+            registry._pop_profiler(self.name, self._profiler)
+            self._profiler = None
+            self.profiled = True
+        if registry.trace_memory:
+            registry._close_segment(self)
+
+    def close(self) -> None:
+        """Add the call to the stage's timer, profile and memory peak."""
+        registry = self.registry
+        registry.add_time(self.name, self.seconds)
+        if self.profiled:
+            registry._dump_profile(self.name)
+        if registry.trace_memory:
+            registry._record_peak(self.name, self.peak)
+
+
+# Shared registry fed by the GET modules
+registry = InstrumentationRegistry()
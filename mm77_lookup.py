@@ -0,0 +1,440 @@
+"""
+MM77 LOOKUP STORE
+Persistent, memory-mapped lookup of MM77 master records by MEID (M101).
+
+The store is built once from the fixed-width MM77 extract: records are written
+in M101 order, in the extract's own fixed-width layout, after a small JSON
+header. An extract already in M101 (ISORT1) order is streamed straight into
+the store; one that is not is sorted externally in bounded runs. Opening a
+store maps the file and looks records up by binary search over the mapped
+rows, so a job start costs one mmap rather than a full reparse of MM77. The
+header carries the size, mtime and SHA-256 of the extract it was built from;
+open_lookup_store() rebuilds the store when they no longer match the extract
+on disk.
+"""
+
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from itertools import chain
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from checkpoint import atomic_write
+from get1_master_record import MasterRecordException
+from mm77_reader import DEFAULT_MM77_LAYOUT, MM77FileReader, MM77Layout, MM77RecordView
+
+logger = logging.getLogger(__name__)
+
+# File signature and header-length prefix of a lookup store
+STORE_MAGIC = b'MM77LKP1'
+_HEADER_LENGTH = struct.Struct('>I')
+
+# Field the store is keyed on
+DEFAULT_KEY_FIELD = 'M101'
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+# Bytes of MM77 rows sorted in memory per run when an extract is not in key order
+DEFAULT_SORT_RUN_BYTES = 64 * 1024 * 1024
+
+# Header room kept for the record count, which is only known once every row is written
+_COUNT_DIGITS = 20
+
+
+def source_fingerprint(path: str, with_hash: bool = True) -> Dict:
+    """
+    Fingerprint an MM77 extract for store invalidation.
+
+    Args:
+        path: Path to the MM77 extract
+        with_hash: Also compute the SHA-256 of the content (reads the whole file)
+
+    Returns:
+        Dict with size, mtime_ns and (if requested) sha256
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+class _KeyColumn:
+    """Sequence view of the sorted keys in a mapped store, for bisect."""
+
+    __slots__ = ('_buffer', '_base', '_stride', '_start', '_end', '_count')
+
+    def __init__(self, buffer, base: int, stride: int, field: tuple, count: int):
+        self._buffer = buffer
+        self._base = base
+        self._stride = stride
+        self._start = field[0]
+        self._end = field[0] + field[1]
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        offset = self._base + index * self._stride
+        return self._buffer[offset + self._start:offset + self._end]
+
+
+class MM77LookupStore:
+    """
+    Read-only, memory-mapped MM77 lookup by MEID.
+
+    Lookups return MM77RecordView objects (O(log n) binary search), which stay
+    valid while the store is open; use to_dict() to keep a record.
+
+    Usage:
+        with open_lookup_store('mm77.dat', 'mm77.lkp') as store:
+            record = store.get('A001')
+    """
+
+    def __init__(self, path: str):
+        """
+        Open and map a lookup store.
+
+        Raises:
+            MasterRecordException: If the file is not a valid lookup store
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._buffer: Optional[mmap.mmap] = None
+        try:
+            self._open()
+        except MasterRecordException:
+            self.close()
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            # A header that decodes as JSON but is not a store header
+            self.close()
+            raise MasterRecordException(
+                f"MM77 lookup store {path} has a corrupt header: {e!r}") from e
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self) -> None:
+        self.header = header = self._read_header()
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.layout = MM77Layout({name: tuple(span) for name, span in header['fields'].items()},
+                                 header['record_length'], encoding=header['encoding'])
+        self.key_field = header['key_field']
+        self.count = header['count']
+        self._base = header['data_offset']
+        self._stride = self.layout.record_length
+        self._keys = _KeyColumn(self._buffer, self._base, self._stride,
+                                self.layout.fields[self.key_field], self.count)
+        expected_size = self._base + self.count * self._stride
+        if len(self._buffer) != expected_size:
+            raise MasterRecordException(
+                f"MM77 lookup store {self.path} is {len(self._buffer)} bytes, "
+                f"expected {expected_size}"
+            )
+
+    def _read_header(self) -> Dict:
+        prefix = self._file.read(len(STORE_MAGIC) + _HEADER_LENGTH.size)
+        if len(prefix) < len(STORE_MAGIC) + _HEADER_LENGTH.size \
+                or not prefix.startswith(STORE_MAGIC):
+            raise MasterRecordException(f"{self.path} is not an MM77 lookup store")
+        (length,) = _HEADER_LENGTH.unpack_from(prefix, len(STORE_MAGIC))
+        try:
+            header = json.loads(self._file.read(length))
+        except ValueError as e:
+            raise MasterRecordException(f"MM77 lookup store {self.path} has a corrupt header") from e
+        header['data_offset'] = len(prefix) + length
+        return header
+
+    def _encode_key(self, meid: str) -> bytes:
+        length = self.layout.fields[self.key_field][1]
+        return meid.encode(self.layout.encoding).ljust(length, self.layout.space)
+
+    def get(self, meid: str, default=None):
+        """Return the record view for an MEID, or default if it is not in MM77."""
+        key = self._encode_key(meid)
+        index = bisect.bisect_left(self._keys, key)
+        if index < self.count and self._keys[index] == key:
+            return MM77RecordView(self._buffer, self._base + index * self._stride, self.layout)
+        return default
+
+    def __getitem__(self, meid: str) -> MM77RecordView:
+        record = self.get(meid)
+        if record is None:
+            raise KeyError(meid)
+        return record
+
+    def __contains__(self, meid: str) -> bool:
+        return self.get(meid) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[MM77RecordView]:
+        """Yield every record in MEID order."""
+        for index in range(self.count):
+            yield MM77RecordView(self._buffer, self._base + index * self._stride, self.layout)
+
+    def is_fresh(self, mm77_path: str, verify_hash: bool = False) -> bool:
+        """
+        Check whether the store still matches an MM77 extract.
+
+        Size and mtime are compared first. A changed mtime with an unchanged
+        size (e.g. a re-copied extract) falls back to comparing the SHA-256,
+        as does verify_hash=True. When only the mtime changed, the new one is
+        written to the store header, so later opens skip the hash again.
+        """
+        built_from = self.header['source']
+        current = source_fingerprint(mm77_path, with_hash=False)
+        if current['size'] != built_from['size']:
+            return False
+        if current['mtime_ns'] == built_from['mtime_ns'] and not verify_hash:
+            return True
+        current = source_fingerprint(mm77_path)
+        if current['sha256'] != built_from['sha256']:
+            return False
+        if current['mtime_ns'] != built_from['mtime_ns']:
+            self._update_source(current)
+        return True
+
+    def _update_source(self, fingerprint: Dict) -> None:
+        # The header is padded to a fixed length, so it is rewritten in place
+        header = _store_header(fingerprint, self.layout, self.key_field, self.count)
+        length = self._base - len(STORE_MAGIC) - _HEADER_LENGTH.size
+        if len(header) > length:
+            logger.debug("MM77 lookup: no header room to record the new mtime of %s", self.path)
+            return
+        try:
+            with open(self.path, 'r+b') as f:
+                _write_header(f, header, length)
+        except OSError as e:
+            logger.warning("MM77 lookup: could not update %s: %s", self.path, e)
+            return
+        self.header['source'] = fingerprint
+
+    def close(self) -> None:
+        """Unmap and close the store; outstanding views become invalid."""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._file.close()
+
+    def __enter__(self) -> 'MM77LookupStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _store_header(fingerprint: Dict, layout: MM77Layout, key_field: str, count: int) -> bytes:
+    return json.dumps({
+        'source': fingerprint,
+        'fields': layout.fields,
+        'record_length': layout.record_length,
+        'encoding': layout.encoding,
+        'key_field': key_field,
+        'count': count,
+    }).encode('utf-8')
+
+
+def _write_header(f: BinaryIO, header: bytes, length: int) -> None:
+    # Padded to a fixed length (JSON allows trailing blanks) so it can be rewritten in place
+    f.write(STORE_MAGIC + _HEADER_LENGTH.pack(length) + header.ljust(length))
+
+
+def _source_rows(reader: MM77FileReader, key_field: str) -> Iterator[Tuple[bytes, bytes]]:
+    """(key, record bytes) of every row up to the "Z" EOF marker, skipping rows without an MEID."""
+    layout = reader.layout
+    blank_key = layout.space * layout.fields[key_field][1]
+    eof_prefix = 'Z'.encode(layout.encoding)
+    for view in reader:
+        key = view.raw(key_field)
+        if key == blank_key:
+            continue
+        if key.startswith(eof_prefix):
+            return
+        yield key, view.record_bytes()
+
+
+def _warn_duplicate(key: bytes, layout: MM77Layout) -> None:
+    logger.warning("MM77 lookup: duplicate MEID %r, keeping first occurrence",
+                   key.decode(layout.encoding).rstrip())
+
+
+def _spill_run(rows: Iterable[bytes]) -> BinaryIO:
+    run = tempfile.TemporaryFile()
+    run.writelines(rows)
+    run.seek(0)
+    return run
+
+
+def _read_run(run: BinaryIO, record_length: int, key_slice: slice) -> Iterator[Tuple[bytes, bytes]]:
+    for row in iter(lambda: run.read(record_length), b''):
+        yield row[key_slice], row
+
+
+def _sorted_runs(entries: Iterable[Tuple[bytes, bytes]], run_bytes: int) -> Iterator[BinaryIO]:
+    """Spill entries as runs of about run_bytes, each sorted stably by key."""
+    run: List[Tuple[bytes, bytes]] = []
+    size = 0
+    for entry in entries:
+        run.append(entry)
+        size += len(entry[1])
+        if size >= run_bytes:
+            run.sort(key=itemgetter(0))
+            yield _spill_run(row for _, row in run)
+            run, size = [], 0
+    if run:
+        run.sort(key=itemgetter(0))
+        yield _spill_run(row for _, row in run)
+
+
+def _write_rows(f: BinaryIO, entries: Iterator[Tuple[bytes, bytes]], layout: MM77Layout,
+                key_field: str, run_bytes: int) -> int:
+    """
+    Write rows in key order, keeping the first row of each MEID, and return
+    the number written. Rows are streamed while the input stays in key
+    order. At the first row that does not, the rows written so far become
+    the first sorted run, the rest of the input is sorted in runs of about
+    run_bytes, and the runs are merged back into f.
+    """
+    data_start = f.tell()
+    count = 0
+    previous_key = None
+    for key, row in entries:
+        if previous_key is not None and key <= previous_key:
+            if key == previous_key:
+                _warn_duplicate(key, layout)
+                continue
+            logger.warning("MM77 lookup: extract is not in %s order after %d records, "
+                           "sorting externally", key_field, count)
+            entries = chain([(key, row)], entries)
+            break
+        f.write(row)
+        count += 1
+        previous_key = key
+    else:
+        return count
+
+    record_length = layout.record_length
+    start, length = layout.fields[key_field]
+    key_slice = slice(start, start + length)
+    runs = [tempfile.TemporaryFile()]
+    try:
+        f.seek(data_start)
+        shutil.copyfileobj(f, runs[0])
+        runs[0].seek(0)
+        f.seek(data_start)
+        f.truncate()
+        runs.extend(_sorted_runs(entries, run_bytes))
+        # heapq.merge keeps equal keys in run (= input) order, so the first row still wins
+        merged = heapq.merge(*(_read_run(run, record_length, key_slice) for run in runs),
+                             key=itemgetter(0))
+        count = 0
+        previous_key = None
+        for key, row in merged:
+            if key == previous_key:
+                _warn_duplicate(key, layout)
+                continue
+            f.write(row)
+            count += 1
+            previous_key = key
+        return count
+    finally:
+        for run in runs:
+            run.close()
+
+
+def build_lookup_store(mm77_path: str, store_path: str,
+                       layout: MM77Layout = DEFAULT_MM77_LAYOUT,
+                       record_separator: bytes = b'\n',
+                       key_field: str = DEFAULT_KEY_FIELD,
+                       run_bytes: int = DEFAULT_SORT_RUN_BYTES) -> int:
+    """
+    Build a lookup store from a fixed-width MM77 extract.
+
+    Rows up to the "Z" EOF marker are stored, parents included; rows without
+    an MEID are skipped. If an MEID repeats, the first row wins. Memory use
+    is bounded by run_bytes, whatever the size of the extract.
+
+    Args:
+        mm77_path: Path to the MM77 extract
+        store_path: Path of the store to (re)write; replaced atomically
+        layout: Field layout of the extract
+        record_separator: Record separator of the extract
+        key_field: Field to key the store on
+        run_bytes: Bytes of rows sorted in memory per run if the extract is
+                   not in key_field order
+
+    Returns:
+        Number of records stored
+    """
+    if key_field not in layout.fields:
+        raise ValueError(f"Key field {key_field} is not declared in the layout")
+    fingerprint = source_fingerprint(mm77_path)
+    # The count is not known up front: reserve room for it and rewrite the header at the end
+    header_length = len(_store_header(fingerprint, layout, key_field, 0)) + _COUNT_DIGITS
+
+    with MM77FileReader(mm77_path, layout, record_separator) as reader, \
+            atomic_write(store_path, 'w+b') as f:
+        _write_header(f, _store_header(fingerprint, layout, key_field, 0), header_length)
+        count = _write_rows(f, _source_rows(reader, key_field), layout, key_field, run_bytes)
+        f.seek(0)
+        _write_header(f, _store_header(fingerprint, layout, key_field, count), header_length)
+    logger.info("MM77 lookup: built %s with %d records", store_path, count)
+    return count
+
+
+def open_lookup_store(mm77_path: str, store_path: str,
+                      layout: MM77Layout = DEFAULT_MM77_LAYOUT,
+                      record_separator: bytes = b'\n',
+                      key_field: str = DEFAULT_KEY_FIELD,
+                      verify_hash: bool = False) -> MM77LookupStore:
+    """
+    Open the lookup store for an MM77 extract, building or rebuilding it when
+    it is missing, unreadable, built with another layout or key, or stale.
+
+    Args:
+        mm77_path: Path to the MM77 extract
+        store_path: Path of the persistent store
+        layout: Field layout of the extract
+        record_separator: Record separator of the extract
+        key_field: Field to key the store on
+        verify_hash: Always compare the SHA-256, not just size and mtime
+
+    Returns:
+        An open MM77LookupStore
+    """
+    try:
+        store = MM77LookupStore(store_path)
+    except FileNotFoundError:
+        store = None
+    except (MasterRecordException, KeyError, TypeError, ValueError) as e:
+        logger.warning("MM77 lookup: %s, rebuilding", e)
+        store = None
+
+    if store is not None:
+        same_layout = (store.key_field == key_field
+                       and store.layout.fields == layout.fields
+                       and store.layout.record_length == layout.record_length
+                       and store.layout.encoding == layout.encoding)
+        if same_layout and store.is_fresh(mm77_path, verify_hash):
+            return store
+        store.close()
+        logger.info("MM77 lookup: %s is stale, rebuilding", store_path)
+
+    build_lookup_store(mm77_path, store_path, layout, record_separator, key_field)
+    return MM77LookupStore(store_path)
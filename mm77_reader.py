@@ -0,0 +1,240 @@
+"""
+MM77 FIXED-WIDTH READER
+Memory-mapped reader for the mainframe-style MM77 ME master extract.
+
+Records are decoded lazily: the reader hands GET1 lightweight MM77RecordView
+objects that point into the mapped file, and a field is only decoded when it is
+asked for. The ISORT1 key can be sliced straight out of the buffer as bytes.
+"""
+
+import mmap
+import os
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from get1_master_record import MasterRecordException
+
+
+class MM77Layout:
+    """
+    Declared field layout of a fixed-width MM77 record.
+
+    Attributes:
+        fields: Mapping of field name to (offset, length) in bytes
+        record_length: Length of one record in bytes, excluding the separator
+        isort1_fields: Fields whose raw bytes are concatenated to form ISORT1
+        encoding: Character encoding of the extract (e.g. 'ascii', 'cp037')
+    """
+
+    def __init__(self, fields: Dict[str, Tuple[int, int]], record_length: int,
+                 isort1_fields: Sequence[str] = ('M101',), encoding: str = 'ascii'):
+        """
+        Initialize and validate the layout.
+
+        Args:
+            fields: Mapping of field name to (offset, length) in bytes
+            record_length: Length of one record in bytes, excluding the separator
+            isort1_fields: Fields that make up the ISORT1 sort key, in key order
+            encoding: Character encoding used when decoding field values
+
+        Raises:
+            ValueError: If a field falls outside the record or an ISORT1 field is undeclared
+        """
+        for name, (offset, length) in fields.items():
+            if offset < 0 or length <= 0 or offset + length > record_length:
+                raise ValueError(f"Field {name} ({offset}, {length}) does not fit a "
+                                 f"{record_length}-byte record")
+        for name in isort1_fields:
+            if name not in fields:
+                raise ValueError(f"ISORT1 field {name} is not declared in the layout")
+
+        self.fields = dict(fields)
+        self.record_length = record_length
+        self.isort1_fields = tuple(isort1_fields)
+        self.encoding = encoding
+        self.space = ' '.encode(encoding)
+        # Pre-resolved (start, end) slices for the ISORT1 key components
+        self.isort1_slices = tuple(
+            (fields[name][0], fields[name][0] + fields[name][1]) for name in isort1_fields
+        )
+
+    def encode_field(self, name: str, value: str) -> bytes:
+        """Raw bytes of a field holding value: encoded and padded to the field length."""
+        return value.encode(self.encoding).ljust(self.fields[name][1], self.space)
+
+    def encode_isort1(self, values: Sequence[str]) -> bytes:
+        """
+        Form the ISORT1 bytes a record with these key field values would have,
+        as MM77RecordView.isort1_key() slices them: each value encoded and
+        padded to its field length.
+
+        Args:
+            values: Decoded values of the ISORT1 fields, in key order
+        """
+        if len(values) != len(self.isort1_fields):
+            raise ValueError(f"ISORT1 has {len(self.isort1_fields)} field(s), "
+                             f"got {len(values)} value(s)")
+        return b''.join(
+            self.encode_field(name, value) for name, value in zip(self.isort1_fields, values)
+        )
+
+
+# Example production layout: record type, MEID, name, parent MEID
+DEFAULT_MM77_LAYOUT = MM77Layout(
+    fields={
+        'M100': (0, 1),     # Record type (P=PARENT, other=DETAIL)
+        'M101': (1, 10),    # MEID
+        'NAME': (11, 30),   # Merchant name
+        'M102': (41, 10),   # Parent MEID
+    },
+    record_length=51,
+)
+
+
+class MM77RecordView:
+    """
+    Read-only view of one record inside a mapped MM77 buffer.
+
+    Supports the dict-style access used by MasterRecordProcessor (get() and
+    item access) without materialising a dict. Views are only valid while the
+    reader that produced them is open; use to_dict() to keep a record.
+    """
+
+    __slots__ = ('_buffer', '_offset', '_layout')
+
+    def __init__(self, buffer, offset: int, layout: MM77Layout):
+        self._buffer = buffer
+        self._offset = offset
+        self._layout = layout
+
+    def raw(self, name: str) -> bytes:
+        """Return the undecoded bytes of a field, including padding."""
+        start, length = self._layout.fields[name]
+        start += self._offset
+        return self._buffer[start:start + length]
+
+    def first_byte(self, name: str) -> int:
+        """First raw byte of a field, as an int; nothing is copied or decoded."""
+        return self._buffer[self._offset + self._layout.fields[name][0]]
+
+    def raw_equals(self, name: str, value: bytes) -> bool:
+        """
+        Compare a field's raw bytes with value (as built by
+        MM77Layout.encode_field) without decoding; a one-byte field is
+        compared without copying it.
+        """
+        start, length = self._layout.fields[name]
+        start += self._offset
+        if length == 1:
+            return self._buffer[start] == value[0]
+        return self._buffer[start:start + length] == value
+
+    def record_bytes(self) -> bytes:
+        """Return the whole undecoded record, excluding the separator."""
+        return self._buffer[self._offset:self._offset + self._layout.record_length]
+
+    def get(self, name: str, default=None):
+        """Decode a field, stripping trailing pad spaces; default if undeclared."""
+        if name not in self._layout.fields:
+            return default
+        return self.raw(name).rstrip(self._layout.space).decode(self._layout.encoding)
+
+    def __getitem__(self, name: str) -> str:
+        if name not in self._layout.fields:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._layout.fields
+
+    def isort1_key(self) -> bytes:
+        """Slice the ISORT1 sort key straight out of the mapped buffer."""
+        base = self._offset
+        slices = self._layout.isort1_slices
+        if len(slices) == 1:
+            start, end = slices[0]
+            return self._buffer[base + start:base + end]
+        return b''.join(self._buffer[base + start:base + end] for start, end in slices)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Materialise the record as a plain dict of decoded fields."""
+        return {name: self.get(name) for name in self._layout.fields}
+
+    def __repr__(self) -> str:
+        return f"MM77RecordView({self.to_dict()})"
+
+
+class MM77FileReader:
+    """
+    Memory-mapped, fixed-width MM77 file reader.
+
+    Iterating the reader yields one MM77RecordView per record. Each iteration
+    starts again from the top of the file, so MasterRecordProcessor.reset()
+    can rewind a processor built on a reader.
+
+    Usage:
+        with MM77FileReader('mm77.dat') as reader:
+            processor = MasterRecordProcessor(reader)
+            for record in processor.iter_valid_records():
+                ...
+    """
+
+    def __init__(self, path: str, layout: MM77Layout = DEFAULT_MM77_LAYOUT,
+                 record_separator: bytes = b'\n'):
+        """
+        Open and map the MM77 file.
+
+        Args:
+            path: Path to the fixed-width MM77 extract
+            layout: Field layout of each record
+            record_separator: Bytes following each record (b'' for pure fixed-block files)
+        """
+        self.path = path
+        self.layout = layout
+        self.record_separator = record_separator
+        self.stride = layout.record_length + len(record_separator)
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._buffer: Optional[mmap.mmap] = None
+        if self._size:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        """Number of complete records in the file."""
+        return self._record_count()
+
+    def _record_count(self) -> int:
+        count, remainder = divmod(self._size, self.stride)
+        # Tolerate a missing separator after the final record
+        if remainder == self.layout.record_length:
+            count += 1
+        elif remainder:
+            raise MasterRecordException(
+                f"MM77 file {self.path} is truncated: {remainder} trailing bytes "
+                f"do not form a {self.layout.record_length}-byte record"
+            )
+        return count
+
+    def __iter__(self) -> Iterator[MM77RecordView]:
+        return self.iter_from(0)
+
+    def iter_from(self, index: int) -> Iterator[MM77RecordView]:
+        """Yield views starting at record index, without scanning earlier rows."""
+        if self._buffer is None:
+            return
+        buffer, layout, stride = self._buffer, self.layout, self.stride
+        for offset in range(index * stride, self._record_count() * stride, stride):
+            yield MM77RecordView(buffer, offset, layout)
+
+    def close(self) -> None:
+        """Unmap and close the file; outstanding views become invalid."""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._file.close()
+
+    def __enter__(self) -> 'MM77FileReader':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,393 @@
+"""
+GET1-GET4 PIPELINE RUNNER
+Runs the GET steps as concurrent stages instead of one after another.
+
+    GET1 masters --q--> GET3 gather --q--> GET3 link (pool) --> linked MEs
+    POS usage    --q--> GET2 aggregate (pool)               --> usage counts
+    GET4 pages (asyncio) --q--> GET4 process (pool)         --> transactions
+
+Stages are coroutines on one asyncio event loop joined by bounded queues of
+record batches, so a fast producer waits for a slow consumer instead of
+buffering the whole input. Blocking reads (the GET1 stream, POS and MA78
+iterables, HTTP page fetches) run on threads via asyncio.to_thread; CPU-bound
+batch work (GET2 aggregation, GET3 mapping, GET4 record processing) runs on
+a worker pool. End-to-end wall time then approaches that of the slowest
+stage rather than the sum of all of them.
+
+Output is collected on the PipelineResult unless the caller passes sinks:
+on_linked(master, links) is called per linked ME and on_transactions(records)
+per processed GET4 page, in input order, as results arrive. Sinks run on the
+event loop, so a slow sink holds back the stages behind it rather than
+letting output pile up in memory.
+
+GET3 links are merge-joined to GET1 masters batch by batch: for each batch of
+masters the gather stage pulls the ISORT1-ordered MA78 links up to the
+batch's last key and ships both to the pool. Keys are formed as MA78MergeJoin
+forms them (processor.isort1 and ma78_link_key), and unkeyed or
+out-of-sequence links are diverted the same way.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from get1_master_record import MasterRecordProcessor
+from get2_pos_usage import DEFAULT_BUSINESS_DATE, POSUsageAggregator
+from get3_merchant_account_links import (
+    MA78BatchProcessor, MA78MergeJoin, MA78_KEY_FIELD, ma78_link_key,
+)
+from mm77_reader import MM77RecordView
+
+logger = logging.getLogger(__name__)
+
+# Records per batch handed between stages
+DEFAULT_BATCH_SIZE = 10_000
+
+# Batches a queue holds before its producer has to wait
+DEFAULT_QUEUE_SIZE = 4
+
+# GET4 pages in flight at once
+DEFAULT_FETCH_CONCURRENCY = 4
+
+# End-of-stream marker put on a queue after the last batch
+_END = object()
+
+
+class PipelineResult:
+    """
+    Output of one pipeline run.
+
+    Attributes:
+        linked: (master, [mapped MA78 links]) for every valid GET1 master,
+                or None if they went to an on_linked sink
+        linked_count: Number of valid GET1 masters linked
+        orphan_links: Number of MA78 links with no matching master
+        out_of_sequence_links: Number of MA78 links whose key is lower than
+                               the previous link's (not joined)
+        link_failures: (link, [messages]) for links that failed validation
+        pos_usage: GET2 POSUsageAggregator, or None if no POS input
+        transactions: GET4 TransactionRecords in page order, or None if no
+                      GET4 input or they went to an on_transactions sink
+        transaction_count: Number of GET4 TransactionRecords produced
+        elapsed: Wall-clock seconds for the whole run
+    """
+
+    def __init__(self):
+        self.linked: Optional[List[Tuple[Any, List[Dict]]]] = []
+        self.linked_count = 0
+        self.orphan_links = 0
+        self.out_of_sequence_links = 0
+        self.link_failures: List[Tuple[Dict, List[str]]] = []
+        self.pos_usage: Optional[POSUsageAggregator] = None
+        self.transactions: Optional[List] = None
+        self.transaction_count = 0
+        self.elapsed = 0.0
+
+
+def _next_batch(iterator: Iterator, batch_size: int) -> List:
+    return list(islice(iterator, batch_size))
+
+
+def _portable(record):
+    # Views point into the reader's mapping and cannot cross to a worker process
+    return record.to_dict() if isinstance(record, MM77RecordView) else record
+
+
+def _next_master_batch(processor: MasterRecordProcessor, masters: Iterator,
+                       batch_size: int) -> List[Tuple[Any, Any]]:
+    # (ISORT1, master): the key is read off the processor as each master is yielded
+    return [(processor.isort1, _portable(record)) for record in islice(masters, batch_size)]
+
+
+async def _produce(next_batch: Callable[[], List], queue: asyncio.Queue) -> None:
+    """Read batches from a blocking source on a thread and queue them."""
+    while True:
+        batch = await asyncio.to_thread(next_batch)
+        if not batch:
+            break
+        await queue.put(batch)
+    await queue.put(_END)
+
+
+async def _map_stage(source: asyncio.Queue, sink: asyncio.Queue, function: Callable,
+                     executor: Executor, concurrency: int) -> None:
+    """Apply function to each batch on the executor, keeping batch order."""
+    loop = asyncio.get_running_loop()
+    pending = deque()
+    while True:
+        batch = await source.get()
+        if batch is _END:
+            break
+        pending.append(loop.run_in_executor(executor, function, batch))
+        if len(pending) >= concurrency:
+            await sink.put(await pending.popleft())
+    while pending:
+        await sink.put(await pending.popleft())
+    await sink.put(_END)
+
+
+async def _consume(queue: asyncio.Queue, consume: Callable[[Any], None]) -> None:
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        consume(item)
+
+
+class _LinkCursor:
+    """
+    Pulls ISORT1-ordered MA78 links up to a master key (runs on a thread).
+    Links are keyed and checked by MA78MergeJoin._ordered_links, so unkeyed
+    and out-of-sequence links are diverted as in the serial join.
+    """
+
+    def __init__(self, links: Iterable, key_field: str, link_key: Callable):
+        self.join = MA78MergeJoin(key_field, link_key)
+        # Nothing is read here: the first pull happens on a thread, like the rest
+        self.links = self.join._ordered_links(links, link_key)
+        self.pending = None
+
+    def _advance(self) -> None:
+        self.pending = next(self.links, _END)
+
+    def take_through(self, master_key) -> List[Tuple[Any, Dict]]:
+        """(key, link) for the links up to master_key, in order."""
+        if self.pending is None:
+            self._advance()
+        taken = []
+        while self.pending is not _END and self.pending[0] <= master_key:
+            link_key, _, link = self.pending
+            taken.append((link_key, link))
+            self._advance()
+        return taken
+
+    def drain(self) -> int:
+        """Consume the links beyond the last master; returns how many there were."""
+        if self.pending is None:
+            self._advance()
+        remaining = 0 if self.pending is _END else 1 + sum(1 for _ in self.links)
+        self.pending = _END
+        return remaining
+
+    def take_diverted(self) -> Tuple[List[Tuple[Dict, List[str]]], int]:
+        """Failures and out-of-sequence count diverted since the last call."""
+        join = self.join
+        failures = [(link, messages) for _, link, messages in join.failures]
+        out_of_sequence = len(join.out_of_sequence_links)
+        join.failures.clear()
+        join.out_of_sequence_links.clear()
+        return failures, out_of_sequence
+
+
+def _link_batch(item: Tuple[List, List, List]):
+    """
+    Worker: merge-join one batch of (key, master) with the (key, link) pairs
+    up to its last key and apply the GET3 mapping to the attached links.
+
+    Returns:
+        (linked, orphan count, failures) for the batch; failures start with
+        the links the gather stage diverted for the batch
+    """
+    masters, links, failures = item
+    mapper = MA78BatchProcessor()
+    linked, orphans, position = [], 0, 0
+    for master_key, master in masters:
+        attached = []
+        while position < len(links) and links[position][0] <= master_key:
+            link_key, link = links[position]
+            if link_key == master_key:
+                attached.append(link)
+            else:
+                orphans += 1
+            position += 1
+        linked.append((master, list(mapper.process(attached))))
+    orphans += len(links) - position
+    failures.extend((link, messages) for _, link, messages in mapper.failures)
+    return linked, orphans, failures
+
+
+def _aggregate_batch(batch: List[Dict], business_date: str, me_field: str) -> POSUsageAggregator:
+    """Worker: GET2 partial counts for one batch of POS records."""
+    return POSUsageAggregator(business_date, me_field).add_records(batch)
+
+
+def _process_page(page: List[Dict]) -> List:
+    """Worker: GET4 record processing for one fetched page."""
+    from get4_transaction_records import process_records
+    return process_records(page)
+
+
+async def _fetch_pages(fetcher, queue: asyncio.Queue, concurrency: int) -> None:
+    """Fetch GET4 pages concurrently on threads, queueing them in page order."""
+    from get4_transaction_records import iter_pages_in_order
+    # The window blocks on its oldest fetch, so it is advanced on a thread too
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pages = iter_pages_in_order(fetcher.fetch_page, fetcher.page_size, executor, concurrency)
+    try:
+        await _produce(partial(next, pages, None), queue)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_pipeline_async(mm77_records: Iterable, ma78_records: Optional[Iterable] = None,
+                             pos_records: Optional[Iterable] = None, fetcher=None,
+                             executor: Optional[Executor] = None,
+                             business_date: str = DEFAULT_BUSINESS_DATE, me_field: str = 'meid',
+                             batch_size: int = DEFAULT_BATCH_SIZE,
+                             queue_size: int = DEFAULT_QUEUE_SIZE,
+                             workers: Optional[int] = None,
+                             fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                             on_linked: Optional[Callable[[Any, List[Dict]], None]] = None,
+                             on_transactions: Optional[Callable[[List], None]] = None
+                             ) -> PipelineResult:
+    """
+    Run GET1/GET3, GET2 and GET4 as concurrent stages; see run_pipeline().
+    """
+    started = time.perf_counter()
+    result = PipelineResult()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    # Batches each pool stage keeps in flight
+    concurrency = workers or os.cpu_count() or 1
+
+    def queue():
+        return asyncio.Queue(maxsize=queue_size)
+
+    # GET1 -> GET3
+    processor = MasterRecordProcessor(mm77_records)
+    masters = processor.iter_valid_records()
+    links = _LinkCursor(ma78_records if ma78_records is not None else (), MA78_KEY_FIELD,
+                        ma78_link_key(processor))
+    master_batches, link_batches, linked_batches = queue(), queue(), queue()
+
+    def diverted_failures():
+        failures, out_of_sequence = links.take_diverted()
+        result.out_of_sequence_links += out_of_sequence
+        return failures
+
+    async def gather_links():
+        while True:
+            batch = await master_batches.get()
+            if batch is _END:
+                break
+            last_key = batch[-1][0]
+            taken = await asyncio.to_thread(links.take_through, last_key)
+            await link_batches.put((batch, taken, diverted_failures()))
+        result.orphan_links += await asyncio.to_thread(links.drain)
+        # Through the pool stage, so the failures stay in link order
+        await link_batches.put(([], [], diverted_failures()))
+        await link_batches.put(_END)
+
+    if on_linked is None:
+        on_linked_batch = result.linked.extend
+    else:
+        result.linked = None
+
+        def on_linked_batch(linked):
+            for master, attached in linked:
+                on_linked(master, attached)
+
+    def collect_linked(item):
+        linked, orphans, failures = item
+        result.linked_count += len(linked)
+        on_linked_batch(linked)
+        result.orphan_links += orphans
+        result.link_failures.extend(failures)
+
+    stages = [
+        _produce(lambda: _next_master_batch(processor, masters, batch_size), master_batches),
+        gather_links(),
+        _map_stage(link_batches, linked_batches, _link_batch, executor, concurrency),
+        _consume(linked_batches, collect_linked),
+    ]
+
+    # GET2
+    if pos_records is not None:
+        pos = iter(pos_records)
+        pos_batches, partials = queue(), queue()
+        result.pos_usage = POSUsageAggregator(business_date, me_field)
+        # A partial (unlike a closure) pickles for a ProcessPoolExecutor
+        aggregate = partial(_aggregate_batch, business_date=business_date, me_field=me_field)
+        stages += [
+            _produce(lambda: _next_batch(pos, batch_size), pos_batches),
+            _map_stage(pos_batches, partials, aggregate, executor, concurrency),
+            _consume(partials, result.pos_usage.merge),
+        ]
+
+    # GET4
+    if fetcher is not None:
+        pages, processed = queue(), queue()
+        if on_transactions is None:
+            result.transactions = []
+            on_transactions = result.transactions.extend
+
+        def collect_transactions(records):
+            result.transaction_count += len(records)
+            on_transactions(records)
+
+        stages += [
+            _fetch_pages(fetcher, pages, fetch_concurrency),
+            _map_stage(pages, processed, _process_page, executor, concurrency),
+            _consume(processed, collect_transactions),
+        ]
+
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+    result.elapsed = time.perf_counter() - started
+    logger.info("PIPELINE: %d MEs linked, %d orphan links, %d out-of-sequence links, "
+                "%s transactions in %.2fs", result.linked_count, result.orphan_links,
+                result.out_of_sequence_links,
+                result.transaction_count if fetcher is not None else 'no', result.elapsed)
+    return result
+
+
+def run_pipeline(mm77_records: Iterable, ma78_records: Optional[Iterable] = None,
+                 pos_records: Optional[Iterable] = None, api_url: Optional[str] = None,
+                 fetcher=None, **options) -> PipelineResult:
+    """
+    Run the GET steps as a concurrent, backpressured pipeline.
+
+    Args:
+        mm77_records: MM77 source for GET1 (list, generator or MM77FileReader)
+        ma78_records: MA78 links in ISORT1 order, joined to the GET1 masters
+        pos_records: POS usage records for GET2
+        api_url: GET4 paged transactions endpoint (uses TransactionPageFetcher)
+        fetcher: Alternative GET4 page source with fetch_page(n) and page_size
+        **options: executor (CPU pool; default a ProcessPoolExecutor),
+                   workers, business_date, me_field, batch_size, queue_size,
+                   fetch_concurrency, on_linked, on_transactions (sinks
+                   that receive the output instead of the PipelineResult)
+
+    Returns:
+        PipelineResult
+
+    Raises:
+        SequenceError: If GET1 detects an out-of-sequence master record
+    """
+    own_fetcher = None
+    if fetcher is None and api_url is not None:
+        from get4_transaction_records import TransactionPageFetcher
+        fetcher = own_fetcher = TransactionPageFetcher(api_url)
+    try:
+        return asyncio.run(run_pipeline_async(mm77_records, ma78_records, pos_records,
+                                              fetcher, **options))
+    finally:
+        if own_fetcher is not None:
+            own_fetcher.close()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from a2_advance_routine_new_me import MERCHANT_INFO_LEVEL, BeelineAdvanceRoutine, MELevelTables
+
+
+class TestMELevelTables(unittest.TestCase):
+
+    def test_lru_eviction_and_counters(self):
+        tables = MELevelTables(max_entries=2)
+        tables.add_table(1, {'n': 1}, 'm1')
+        tables.add_table(1, {'n': 2}, 'm2')
+        tables.get_table(1, 'm1')  # m1 becomes most recently used
+        tables.add_table(2, {'n': 3}, 'm3')
+        self.assertIsNone(tables.get_table(1, 'm2'))
+        self.assertEqual(tables.get_table(1, 'm1'), {'n': 1})
+        stats = tables.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses'], stats['evictions']),
+                         (2, 2, 1, 1))
+        tables.reset_level(1)
+        self.assertEqual(tables.level_index, {2: {'m3'}})
+        self.assertEqual(tables.merchant_levels('m1'), set())
+
+    def test_rewritten_entry_becomes_most_recently_used(self):
+        tables = MELevelTables(max_entries=2)
+        tables.add_table(1, {'n': 1}, 'm1')
+        tables.add_table(1, {'n': 2}, 'm2')
+        tables.add_table(1, {'n': 10}, 'm1')
+        tables.add_table(1, {'n': 3}, 'm3')
+        self.assertEqual(tables.get_table(1, 'm1'), {'n': 10})
+        self.assertIsNone(tables.get_table(1, 'm2'))
+
+    def test_byte_budget(self):
+        tables = MELevelTables(max_bytes=250, sizeof=lambda data: 100)
+        for merchant_id in ('m1', 'm2', 'm3'):
+            tables.add_table(1, {}, merchant_id)
+        self.assertEqual(list(tables.tables), [(1, 'm2'), (1, 'm3')])
+        self.assertEqual(tables.stats()['bytes'], 200)
+
+    def test_spill_to_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tables = MELevelTables(max_entries=1, spill_path=os.path.join(directory, 'spill'))
+            self.addCleanup(tables.close)
+            tables.add_table(1, {'n': 1}, 'm1')
+            tables.add_table(1, {'n': 2}, 'm2')
+            self.assertEqual(tables.stats()['spills'], 1)
+            self.assertEqual(tables.get_table(1, 'm1'), {'n': 1})
+            tables.reset_level(1)
+            self.assertIsNone(tables.get_table(1, 'm2'))
+            tables.close()
+
+
+class TestBeelineAdvanceRoutine(unittest.TestCase):
+
+    def test_merchant_info_is_merged_and_reset(self):
+        routine = BeelineAdvanceRoutine(MELevelTables(max_entries=10))
+        routine.manage_merchant_info('merchant1', {'name': 'Merchant A', 'status': 'active'})
+        routine.manage_merchant_info('merchant1', {'status': 'suspended'})
+        self.assertEqual(routine.get_merchant_info('merchant1'),
+                         {'name': 'Merchant A', 'status': 'suspended'})
+        routine.reset_me_level(MERCHANT_INFO_LEVEL)
+        self.assertIsNone(routine.get_merchant_info('merchant1'))
+
+    def test_merchant_master_without_lookup(self):
+        self.assertIsNone(BeelineAdvanceRoutine().merchant_master('merchant1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from beeline_cyclic_loop import BeelineCyclicLoop
+from get1_master_record import MasterRecordProcessor, SequenceError
+from get3_merchant_account_links import ma78_isort1, ma78_link_key
+from mm77_reader import MM77FileReader
+
+
+def masters():
+    return [
+        {'M100': 'D', 'M101': 'A0010001'},
+        {'M100': 'D', 'M101': 'A0010002'},
+        {'M100': 'P', 'M101': 'A0020000'},
+        {'M100': 'D', 'M101': 'A0020001'},
+        {'M100': 'D', 'M101': 'B0010001'},
+        {'M100': 'D', 'M101': 'Z9999999'},
+    ]
+
+
+class TestBeelineCyclicLoop(unittest.TestCase):
+
+    def test_me_and_batch_breaks_with_streams(self):
+        links = [{'M101': 'A0010001', 'ACCT': '1'}, {'M101': 'A0010001', 'ACCT': '2'},
+                 {'M101': 'A0020000', 'ACCT': '3'}, {'M101': 'B0010001', 'ACCT': '4'},
+                 {'M101': 'A0010002', 'ACCT': '5'}, {'M101': 'C0000001', 'ACCT': '6'}]
+        usage = [('A0020001', {'TID001': 2})]
+        events = []
+
+        loop = BeelineCyclicLoop(MasterRecordProcessor(r for r in masters()))
+        loop.add_stream('GET3', iter(links), key=ma78_isort1)
+        loop.add_stream('GET2', iter(usage), key=lambda item: item[0].ljust(10, ' '))
+        loop.on_me_break(lambda group: events.append(
+            ('ME', group.master['M101'],
+             [link['ACCT'] for link in group.attachments['GET3']], len(group.attachments['GET2']))))
+        loop.on_batch_break(lambda batch_key, count: events.append(('BATCH', batch_key, count)))
+        loop.on_end_of_job(lambda summary: events.append(('EOJ',)))
+        summary = loop.run()
+
+        self.assertEqual(events, [
+            ('ME', 'A0010001', ['1', '2'], 0),
+            ('ME', 'A0010002', [], 0),
+            ('BATCH', 'A001', 2),
+            ('ME', 'A0020001', [], 1),
+            ('BATCH', 'A002', 1),
+            ('ME', 'B0010001', ['4'], 0),
+            ('BATCH', 'B001', 1),
+            ('EOJ',),
+        ])
+        self.assertEqual(summary['me_count'], 4)
+        self.assertEqual(summary['batch_count'], 3)
+        self.assertEqual(summary['orphans'], {'GET3': 2, 'GET2': 0})
+        self.assertEqual(summary['out_of_sequence'], {'GET3': 1, 'GET2': 0})
+
+    def test_empty_master_stream_still_ends_job(self):
+        ended = []
+        loop = BeelineCyclicLoop(MasterRecordProcessor([]))
+        loop.on_end_of_job(ended.append)
+        self.assertEqual(loop.run()['me_count'], 0)
+        self.assertEqual(len(ended), 1)
+
+    def test_fixed_width_masters_with_link_stream(self):
+        handle, path = tempfile.mkstemp(suffix='.dat')
+        with os.fdopen(handle, 'w') as f:
+            for record in masters():
+                f.write(f"{record['M100']:1}{record['M101']:10}{'':30}{'':10}\n")
+        self.addCleanup(os.remove, path)
+        links = [{'M101': 'A0010002', 'ACCT': '1'}, {'M101': 'B0010001', 'ACCT': '2'}]
+        attached = {}
+
+        with MM77FileReader(path) as reader:
+            processor = MasterRecordProcessor(reader)
+            loop = BeelineCyclicLoop(processor)
+            loop.add_stream('GET3', iter(links), key=ma78_link_key(processor))
+            loop.on_me_break(lambda group: attached.update(
+                {group.master['M101']: [link['ACCT'] for link in group.attachments['GET3']]}))
+            summary = loop.run()
+        self.assertEqual(attached, {'A0010001': [], 'A0010002': ['1'], 'A0020001': [],
+                                    'B0010001': ['2']})
+        self.assertEqual(summary['orphans'], {'GET3': 0})
+
+    def test_master_sequence_error_propagates(self):
+        records = [{'M100': 'D', 'M101': 'B001'}, {'M100': 'D', 'M101': 'A001'}]
+        with self.assertRaises(SequenceError):
+            BeelineCyclicLoop(MasterRecordProcessor(records)).run()
+
+
+class TestBeelineCheckpointRestart(unittest.TestCase):
+
+    def run_loop(self, records, links, checkpoint_path):
+        loop = BeelineCyclicLoop(MasterRecordProcessor(iter(records)), batch_key_length=2,
+                                 checkpoint_path=checkpoint_path, checkpoint_interval=3)
+        loop.add_stream('GET3', iter(links), key=ma78_isort1)
+
+        def count_links(group):
+            totals = loop.accumulators.setdefault('links', {})
+            totals[group.key.strip()] = len(group.attachments['GET3'])
+
+        loop.on_me_break(count_links)
+        return loop, loop.run
+
+    def test_restart_matches_clean_run(self):
+        records = [{'M100': 'D', 'M101': f'{prefix}{i}'} for prefix in ('A', 'B', 'C') for i in range(4)]
+        links = [{'M101': r['M101']} for r in records for _ in range(2)]
+        with tempfile.TemporaryDirectory() as directory:
+            clean_loop, run = self.run_loop(records, links, os.path.join(directory, 'clean.ckpt'))
+            clean = run()
+
+            checkpoint_path = os.path.join(directory, 'loop.ckpt')
+            broken = list(records)
+            broken[8] = {'M100': 'D', 'M101': 'A9'}
+            _, run = self.run_loop(broken, links, checkpoint_path)
+            with self.assertRaises(SequenceError):
+                run()
+            self.assertTrue(os.path.exists(checkpoint_path))
+
+            restarted_loop, run = self.run_loop(records, links, checkpoint_path)
+            self.assertEqual(run(), clean)
+            self.assertEqual(restarted_loop.accumulators, clean_loop.accumulators)
+            self.assertFalse(os.path.exists(checkpoint_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
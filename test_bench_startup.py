@@ -0,0 +1,24 @@
+import unittest
+
+from benchmarks import bench_startup
+
+
+class TestImportSideEffects(unittest.TestCase):
+
+    def test_get_modules_import_without_side_effects(self):
+        for stage in bench_startup.STAGES:
+            with self.subTest(stage=stage):
+                result = bench_startup.measure_startup(stage, runs=1)
+                self.assertEqual(bench_startup.side_effects(result), [])
+                self.assertGreater(result['import_ms'], 0)
+
+    def test_side_effects_are_reported(self):
+        result = {'heavy_modules': ['requests'], 'root_handlers': 1,
+                  'files_written': ['get4_transaction_records.log']}
+        self.assertEqual(bench_startup.side_effects(result),
+                         ['imports requests', 'installs 1 root logging handler(s)',
+                          'writes get4_transaction_records.log'])
+
+
+if __name__ == '__main__':
+    unittest.main()
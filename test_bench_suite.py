@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks import bench_suite
+from benchmarks.generators import generate_ma78, generate_mm77, generate_pos
+from get1_master_record import MasterRecordProcessor
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_generators_are_seeded(self):
+        self.assertEqual(generate_pos(100, seed=1), generate_pos(100, seed=1))
+        self.assertNotEqual(generate_pos(100, seed=1), generate_pos(100, seed=2))
+        self.assertEqual(len(generate_ma78(101)), 101)
+
+    def test_mm77_is_in_sequence(self):
+        records = generate_mm77(500)
+        valid = MasterRecordProcessor(records).process_all_records()
+        self.assertEqual(len(valid), sum(1 for r in records[:-1] if r['M100'] != 'P'))
+
+    def test_parse_scale_and_percentile(self):
+        self.assertEqual([bench_suite.parse_scale(s) for s in ('10k', '1M', '2.5m', '300')],
+                         [10_000, 1_000_000, 2_500_000, 300])
+        self.assertEqual(bench_suite.percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(bench_suite.percentile([7], 50), 7)
+
+    def test_run_save_and_compare(self):
+        results = bench_suite.run_suite(['get1', 'get3'], [200], latency_sample=50, isolate=False)
+        self.assertEqual([r['stage'] for r in results], ['get1', 'get3'])
+        self.assertTrue(all(r['rows_per_sec'] > 0 and r['p99_us'] >= r['p50_us'] for r in results))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            bench_suite.save_baseline(path, results, seed=13)
+            baseline = bench_suite.load_baseline(path)
+        self.assertEqual(baseline['results'], results)
+
+        slower = [dict(r, rows_per_sec=r['rows_per_sec'] * 0.5) for r in results]
+        comparisons = bench_suite.compare(slower, baseline, tolerance=0.1)
+        self.assertTrue(all(c['regression'] for c in comparisons))
+        self.assertFalse(any(c['regression'] for c in bench_suite.compare(results, baseline)))
+
+
+if __name__ == '__main__':
+    unittest.main()
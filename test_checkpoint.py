@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from checkpoint import atomic_write, read_checkpoint, write_checkpoint
+
+
+class TestAtomicWrite(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'state.json')
+
+    def test_checkpoint_round_trip(self):
+        self.assertIsNone(read_checkpoint(self.path))
+        write_checkpoint(self.path, {'pm': 3})
+        write_checkpoint(self.path, {'pm': 7})
+        self.assertEqual(read_checkpoint(self.path), {'pm': 7})
+        self.assertEqual(os.listdir(self.directory), ['state.json'])
+
+    def test_failed_write_keeps_previous_file(self):
+        write_checkpoint(self.path, {'pm': 3})
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path, 'wb') as f:
+                f.write(b'partial')
+                raise RuntimeError('writer crashed')
+        self.assertEqual(read_checkpoint(self.path), {'pm': 3})
+        self.assertEqual(os.listdir(self.directory), ['state.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
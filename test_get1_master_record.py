@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from get1_master_record import (
+    MM77Record, MasterRecordException, MasterRecordProcessor, SequenceError,
+)
+
+
+def sample_records():
+    return [
+        {'M100': 'D', 'M101': 'A001', 'NAME': 'Merchant A'},
+        {'M100': 'D', 'M101': 'B002', 'NAME': 'Merchant B'},
+        {'M100': 'P', 'M101': 'C003', 'NAME': 'Parent Merchant C'},
+        {'M100': 'D', 'M101': 'D004', 'NAME': 'Merchant D'},
+        {'M100': 'D', 'M101': 'Z999', 'NAME': 'EOF Marker'},
+    ]
+
+
+class TestMasterRecordStreaming(unittest.TestCase):
+
+    def test_generator_matches_list(self):
+        from_list = MasterRecordProcessor(sample_records()).process_all_records()
+        from_stream = MasterRecordProcessor(r for r in sample_records()).process_all_records()
+        self.assertEqual(from_stream, from_list)
+        self.assertEqual([r['M101'] for r in from_list], ['A001', 'B002', 'D004'])
+
+    def test_iter_valid_records_is_lazy(self):
+        consumed = []
+
+        def source():
+            for record in sample_records():
+                consumed.append(record['M101'])
+                yield record
+
+        stream = MasterRecordProcessor(source()).iter_valid_records()
+        self.assertEqual(next(stream)['M101'], 'A001')
+        self.assertEqual(consumed, ['A001'])
+
+    def test_sequence_error_on_stream(self):
+        records = iter([{'M100': 'D', 'M101': 'B002'}, {'M100': 'D', 'M101': 'A001'}])
+        with self.assertRaises(SequenceError):
+            MasterRecordProcessor(records).process_all_records()
+
+    def test_reset_rewinds_list_but_not_generator(self):
+        processor = MasterRecordProcessor(sample_records())
+        first = processor.process_all_records()
+        processor.reset()
+        self.assertEqual(processor.process_all_records(), first)
+
+        one_shot = MasterRecordProcessor(r for r in sample_records())
+        one_shot.process_all_records()
+        with self.assertRaises(MasterRecordException):
+            one_shot.reset()
+
+
+class TestMM77Record(unittest.TestCase):
+
+    def test_compact_records_are_drop_in(self):
+        compact = [MM77Record.from_dict(r) for r in sample_records()]
+        valid = MasterRecordProcessor(compact).process_all_records()
+        self.assertEqual([r['M101'] for r in valid], ['A001', 'B002', 'D004'])
+        self.assertEqual(valid[0].to_dict()['NAME'], 'Merchant A')
+        self.assertFalse(hasattr(valid[0], '__dict__'))
+        self.assertIsNone(valid[0].get('UNKNOWN'))
+
+
+class TestMasterRecordCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint_path = os.path.join(directory.name, 'get1.ckpt')
+
+    def test_resume_from_fixed_record(self):
+        records = [{'M100': 'D', 'M101': f'M{i:04d}'} for i in range(10)]
+        records[3] = {'M100': 'P', 'M101': 'P0000'}
+        records[6] = {'M100': 'D', 'M101': 'A0000'}  # out of sequence
+
+        processor = MasterRecordProcessor(records, checkpoint_path=self.checkpoint_path,
+                                          checkpoint_interval=2)
+        seen = []
+        with self.assertRaises(SequenceError):
+            for record in processor.iter_valid_records():
+                seen.append(record['M101'])
+        self.assertEqual(seen, ['M0000', 'M0001', 'M0002', 'M0004', 'M0005'])
+
+        records[6] = {'M100': 'D', 'M101': 'M0006'}  # fixed
+        restarted = MasterRecordProcessor(r for r in records)
+        restarted.checkpoint_path = self.checkpoint_path
+        self.assertTrue(restarted.resume_from_checkpoint())
+        remaining = [r['M101'] for r in restarted.iter_valid_records()]
+        self.assertEqual(remaining, ['M0006', 'M0007', 'M0008', 'M0009'])
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        self.assertFalse(restarted.resume_from_checkpoint())
+
+    def test_bytes_keys_round_trip(self):
+        processor = MasterRecordProcessor([])
+        processor.psort1, processor._resume_pm = b'A001      ', 4
+        restored = MasterRecordProcessor([{'M100': 'D', 'M101': 'X'}] * 5)
+        restored.restore_state(processor.checkpoint_state())
+        self.assertEqual((restored.pm, restored.psort1), (4, b'A001      '))
+        self.assertIsNone(restored.get_next_record())
+
+
+class TestSequencePrescan(unittest.TestCase):
+
+    def test_reports_every_break(self):
+        records = [{'M100': 'D', 'M101': f'M{i:04d}'} for i in range(20)]
+        records[4] = {'M100': 'D', 'M101': 'A0000'}
+        records[5] = {'M100': 'P', 'M101': 'P0000'}
+        records[12] = {'M100': 'D', 'M101': 'M0011'}
+        records[15] = {'M100': 'D'}
+        records[18] = {'M100': 'D', 'M101': 'Z999'}
+        for chunk_size in (3, 4, 100):
+            report = MasterRecordProcessor(iter(records)).prescan_sequence(chunk_size=chunk_size)
+            self.assertEqual([pm for pm, _, _ in report.breaks], [4, 12])
+            self.assertEqual(report.parent_count, 1)
+            self.assertEqual(report.missing_meid, [15])
+            self.assertEqual((report.eof_position, report.eof_marker, report.rows), (18, True, 19))
+            self.assertEqual(report.valid_records, 16)
+            self.assertFalse(report.ok)
+
+    def test_clean_file_matches_get1(self):
+        processor = MasterRecordProcessor(sample_records())
+        report = processor.prescan_sequence()
+        self.assertTrue(report.ok)
+        self.assertEqual(report.valid_records, len(processor.process_all_records()))
+        self.assertEqual(report.eof_position, 4)
+        self.assertGreater(report.records_per_sec, 0)
+
+        no_marker = MasterRecordProcessor(sample_records()[:3]).prescan_sequence()
+        self.assertEqual((no_marker.eof_position, no_marker.eof_marker), (3, False))
+
+
+class TestMasterRecordLogging(unittest.TestCase):
+
+    def test_no_per_record_info_logging(self):
+        records = [{'M100': 'D', 'M101': 'M%05d' % i} for i in range(50)]
+        with self.assertLogs('get1_master_record', level='INFO') as captured:
+            MasterRecordProcessor(records, progress_interval=20).process_all_records()
+        progress = [m for m in captured.output if 'records/sec' in m]
+        self.assertEqual(len(progress), 2)
+        self.assertLess(len(captured.output), 6)
+
+    def test_import_does_not_configure_root_logger(self):
+        code = 'import logging, get1_master_record; print(len(logging.getLogger().handlers))'
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertEqual(result.stdout.strip(), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import unittest
+
+from get1_master_record import MasterRecordProcessor, SequenceError
+from get1_sharded import process_all_records_sharded
+
+
+def synthetic_mm77(count, seed=21):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        records.append({'M100': 'P' if rng.random() < 0.1 else 'D', 'M101': f'M{i:06d}',
+                        'NAME': f'Merchant {i}', 'M102': ''})
+    return records
+
+
+def serial(records):
+    try:
+        return MasterRecordProcessor(records).process_all_records(), None
+    except SequenceError as e:
+        return None, (str(e), e.pm)
+
+
+def sharded(source, **kwargs):
+    try:
+        return process_all_records_sharded(source, **kwargs), None
+    except SequenceError as e:
+        return None, (str(e), e.pm)
+
+
+class TestShardedGET1(unittest.TestCase):
+
+    def test_matches_serial_output_and_errors(self):
+        clean = synthetic_mm77(500)
+        with_marker = clean[:300] + [{'M100': 'D', 'M101': 'Z999'}] + clean[300:]
+        shard_break = list(clean)
+        shard_break[100] = dict(shard_break[99])       # duplicate key at a shard boundary
+        inner_break = list(clean)
+        inner_break[237] = {'M100': 'D', 'M101': 'A000001'}
+        after_marker = with_marker[:320] + [{'M100': 'D', 'M101': 'A0'}] + with_marker[320:]
+        for records in (clean, with_marker, shard_break, inner_break, after_marker):
+            expected = serial(records)
+            for workers in (1, 2):
+                self.assertEqual(sharded(records, workers=workers, shard_size=50), expected)
+
+    def test_fixed_width_file(self):
+        records = synthetic_mm77(120)
+        records[70] = {'M100': 'D', 'M101': 'M000010', 'NAME': '', 'M102': ''}
+        handle, path = tempfile.mkstemp(suffix='.dat')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as f:
+            for r in records:
+                f.write(f"{r['M100']:1}{r['M101']:10}{r['NAME']:30}{r['M102']:10}\n")
+
+        result, error = sharded(path, workers=2, shard_size=25)
+        self.assertIsNone(result)
+        self.assertEqual(error[1], 70)
+
+        result, error = sharded(path, workers=1, shard_size=25)
+        self.assertEqual(error[1], 70)
+
+        records[70]['M101'] = 'M000070'
+        with open(path, 'w') as f:
+            for r in records:
+                f.write(f"{r['M100']:1}{r['M101']:10}{r['NAME']:30}{r['M102']:10}\n")
+        result, error = sharded(path, workers=2, shard_size=25)
+        self.assertIsNone(error)
+        self.assertEqual(result, [r for r in records if r['M100'] != 'P'])
+
+
+if __name__ == '__main__':
+    unittest.main()
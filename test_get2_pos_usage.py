@@ -0,0 +1,191 @@
+import csv
+import os
+import random
+import tempfile
+import unittest
+
+import get2_pos_usage
+from get2_pos_usage import (
+    IncrementalPOSUsage, POSUsageAggregator, get2_pos_usage as get2, get2_pos_usage_parallel,
+)
+
+
+def synthetic_pos_records(count, seed=7):
+    rng = random.Random(seed)
+    dates = ['2026-02-07', '2026-02-08', '2026-02-09']
+    records = []
+    for _ in range(count):
+        tid = f'TID{rng.randrange(40):03d}'
+        records.append({'tid': tid, 'date': rng.choice(dates), 'meid': f'ME{int(tid[3:]) % 7}'})
+    return records
+
+
+def reference_me_rollup(records, business_date):
+    rollup = {}
+    for record in records:
+        if record['date'] == business_date:
+            usage = rollup.setdefault(record['meid'], {})
+            usage[record['tid']] = usage.get(record['tid'], 0) + 1
+    return rollup
+
+
+class TestGet2PosUsage(unittest.TestCase):
+
+    def test_business_date_parameter(self):
+        records = [{'tid': 'TID001', 'date': '2026-02-09'}, {'tid': 'TID001', 'date': '2026-02-08'}]
+        self.assertEqual(get2(records), {'TID001': 1})
+        self.assertEqual(get2(records, business_date='2026-02-09'), {'TID001': 1})
+        self.assertEqual(get2(records, business_date='2026-02-10'), {})
+
+    def test_aggregator_matches_reference(self):
+        records = synthetic_pos_records(5000)
+        for business_date in ('2026-02-08', '2026-02-09'):
+            aggregator = POSUsageAggregator(business_date)
+            aggregator.add_records(records[:777]).add_records(records[777:])
+            expected = get2(records, business_date)
+            self.assertEqual(aggregator.tid_usage, expected)
+            self.assertEqual(list(aggregator.tid_usage), list(expected))
+            rollup = reference_me_rollup(records, business_date)
+            self.assertEqual(aggregator.me_tid_usage, rollup)
+            self.assertEqual(list(aggregator.me_tid_usage), list(rollup))
+
+    def test_mixed_types(self):
+        records = [{'tid': 1, 'date': '2026-02-08', 'meid': 'ME1'},
+                   {'tid': '1', 'date': '2026-02-08', 'meid': 2},
+                   {'tid': None, 'date': '2026-02-08', 'meid': 'ME1'},
+                   {'tid': 1, 'date': '2026-02-08', 'meid': None},
+                   {'tid': '1', 'date': '2026-02-07', 'meid': 2},
+                   {'tid': 1, 'date': '2026-02-08', 'meid': 2}]
+        aggregator = POSUsageAggregator().add_records(records)
+        expected = get2(records)
+        self.assertEqual(expected, {1: 3, '1': 1, None: 1})
+        self.assertEqual(aggregator.tid_usage, expected)
+        self.assertEqual(list(aggregator.tid_usage), list(expected))
+        self.assertEqual(aggregator.me_tid_usage, {'ME1': {1: 1, None: 1}, 2: {'1': 1, 1: 1}})
+
+    def test_records_without_me_are_not_rolled_up(self):
+        aggregator = POSUsageAggregator().add_records([{'tid': 'TID001', 'date': '2026-02-08'}])
+        self.assertEqual(aggregator.tid_usage, {'TID001': 1})
+        self.assertEqual(aggregator.me_tid_usage, {})
+
+
+class TestGet2PosUsageParallel(unittest.TestCase):
+
+    def write_log(self, records):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['tid', 'date', 'meid'])
+            writer.writeheader()
+            writer.writerows(records)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_parallel_matches_single_threaded(self):
+        records = synthetic_pos_records(6000, seed=11)
+        partitions = [records[i:i + 1000] for i in range(0, len(records), 1000)]
+        paths = [self.write_log(part) for part in partitions[:3]] + partitions[3:]
+        dates = ['2026-02-07', '2026-02-08', '2026-02-09', '2026-02-10']
+        for workers in (1, 2):
+            results = get2_pos_usage_parallel(paths, dates, workers=workers)
+            self.assertEqual(list(results), dates)
+            for date in dates:
+                expected = get2(records, date)
+                self.assertEqual(results[date].tid_usage, expected)
+                self.assertEqual(list(results[date].tid_usage), list(expected))
+                self.assertEqual(results[date].me_tid_usage, reference_me_rollup(records, date))
+
+    def test_log_partitions_match_dict_reader(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as f:
+            f.write('date,tid,meid\n2026-02-08,TID001,ME1\n\n2026-02-08,TID002\n'
+                    '2026-02-08,TID001,\n2026-02-07,TID001,ME1\n')
+        self.addCleanup(os.remove, path)
+        records = list(get2_pos_usage.read_pos_log(path))
+        result = get2_pos_usage_parallel([path], ['2026-02-08'], workers=1)['2026-02-08']
+        self.assertEqual(result.tid_usage, get2(records))
+        self.assertEqual(result.me_tid_usage, {'ME1': {'TID001': 1}, '': {'TID001': 1}})
+
+    def test_single_log_is_split_into_line_aligned_ranges(self):
+        records = synthetic_pos_records(3000, seed=13)
+        path = self.write_log(records)
+        header, ranges = get2_pos_usage._log_ranges(path, 7)
+        self.assertEqual(header, ['tid', 'date', 'meid'])
+        self.assertEqual(len(ranges), 7)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for start, end in ranges:
+            self.assertEqual(data[start - 1:start], b'\n')
+        self.assertEqual(ranges[-1][1], len(data))
+        for workers in (1, 2):
+            results = get2_pos_usage_parallel(path, ['2026-02-08', '2026-02-09'],
+                                              workers=workers, ranges_per_log=7)
+            for date, result in results.items():
+                expected = get2(records, date)
+                self.assertEqual(result.tid_usage, expected)
+                self.assertEqual(list(result.tid_usage), list(expected))
+                self.assertEqual(result.me_tid_usage, reference_me_rollup(records, date))
+
+    def test_more_ranges_than_lines(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as f:
+            f.write('tid,date\r\nTID001,2026-02-08\r\nTID002,2026-02-08')
+        self.addCleanup(os.remove, path)
+        result = get2_pos_usage_parallel(path, ['2026-02-08'], workers=1, ranges_per_log=50)
+        self.assertEqual(result['2026-02-08'].tid_usage, {'TID001': 1, 'TID002': 1})
+
+    def test_iterators_are_rejected(self):
+        records = synthetic_pos_records(10)
+        with self.assertRaisesRegex(TypeError, 'generator'):
+            get2_pos_usage_parallel((part for part in [records]), ['2026-02-08'], workers=2)
+        with self.assertRaisesRegex(TypeError, 'partition'):
+            get2_pos_usage_parallel([iter(records)], ['2026-02-08'], workers=2)
+
+    def test_merge_rejects_other_business_date(self):
+        with self.assertRaises(ValueError):
+            POSUsageAggregator('2026-02-08').merge(POSUsageAggregator('2026-02-09'))
+
+
+class TestIncrementalPOSUsage(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_path = os.path.join(directory.name, 'pos.csv')
+        self.state_path = os.path.join(directory.name, 'pos_usage.json')
+        with open(self.log_path, 'w') as f:
+            f.write('tid,date,meid\n')
+
+    def append(self, text):
+        with open(self.log_path, 'a') as f:
+            f.write(text)
+
+    def test_refresh_processes_only_appended_records(self):
+        records = synthetic_pos_records(900, seed=3)
+        for start in range(0, 900, 300):
+            self.append(''.join(f"{r['tid']},{r['date']},{r['meid']}\n"
+                                for r in records[start:start + 300]))
+            # A fresh instance per refresh simulates a process restart
+            result = IncrementalPOSUsage(self.log_path, self.state_path).refresh('2026-02-08')
+            expected = get2(records[:start + 300], '2026-02-08')
+            self.assertEqual(result.tid_usage, expected)
+            self.assertEqual(list(result.tid_usage), list(expected))
+            self.assertEqual(result.me_tid_usage,
+                             reference_me_rollup(records[:start + 300], '2026-02-08'))
+
+    def test_partial_line_waits_for_next_refresh(self):
+        usage = IncrementalPOSUsage(self.log_path, self.state_path)
+        self.append('TID001,2026-02-08,ME1\nTID002,2026-02')
+        self.assertEqual(usage.refresh('2026-02-08').tid_usage, {'TID001': 1})
+        self.append('-08,ME1\n')
+        self.assertEqual(usage.refresh('2026-02-08').tid_usage, {'TID001': 1, 'TID002': 1})
+
+    def test_business_date_rollover_resets_counts(self):
+        usage = IncrementalPOSUsage(self.log_path, self.state_path)
+        self.append('TID001,2026-02-08,ME1\nTID001,2026-02-09,ME1\n')
+        self.assertEqual(usage.refresh('2026-02-08').tid_usage, {'TID001': 1})
+        self.append('TID002,2026-02-09,ME1\n')
+        self.assertEqual(usage.refresh('2026-02-09').tid_usage, {'TID001': 1, 'TID002': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+
+from get1_master_record import MasterRecordProcessor
+from get3_merchant_account_links import (
+    MA78BatchProcessor, MA78MappingPlan, MA78MergeJoin, ma78_isort1, ma78_link_key,
+    process_merchant_account_links,
+)
+from mm77_reader import MM77FileReader, MM77Layout
+
+
+class TestMerchantAccountLinks(unittest.TestCase):
+
+    def test_single_record_mapping(self):
+        result = process_merchant_account_links({'field1': 'a', 'field2': 'b', 'field3': 'c'})
+        self.assertEqual(result, {'mappedField1': 'a', 'mappedField2': 'b', 'mappedField3': 'c'})
+        with self.assertRaisesRegex(ValueError, 'Missing required field: field2'):
+            process_merchant_account_links({'field1': 'a', 'field3': 'c'})
+
+    def test_batch_streams_and_collects_failures(self):
+        records = [
+            {'field1': 'a', 'field2': 'b', 'field3': 'c'},
+            {'field1': 'a'},
+            {'field1': 'd', 'field2': 'e', 'field3': 'f', 'extra': 'ignored'},
+        ]
+        processor = MA78BatchProcessor()
+        mapped = list(processor.process(records))
+        self.assertEqual([m['mappedField1'] for m in mapped], ['a', 'd'])
+        self.assertEqual(processor.failures, [
+            (1, records[1], ['Missing required field: field2', 'Missing required field: field3']),
+        ])
+
+    def test_single_field_layout(self):
+        plan = MA78MappingPlan((('ACCT', 'account'),))
+        self.assertEqual(list(MA78BatchProcessor(plan).process([{'ACCT': '1'}])), [{'account': '1'}])
+
+
+class TestMA78MergeJoin(unittest.TestCase):
+
+    def test_links_attach_to_master_records(self):
+        masters = [
+            {'M100': 'D', 'M101': 'A001'},
+            {'M100': 'P', 'M101': 'B002'},
+            {'M100': 'D', 'M101': 'C003'},
+            {'M100': 'D', 'M101': 'E005'},
+            {'M100': 'D', 'M101': 'Z999'},
+        ]
+        links = [
+            {'M101': 'A001', 'ACCT': '1'},
+            {'M101': 'A001', 'ACCT': '2'},
+            {'M101': 'B002', 'ACCT': '3'},   # parent record is bypassed by GET1
+            {'M101': 'C003', 'ACCT': '4'},
+            {'M101': 'A001', 'ACCT': '5'},   # out of sequence
+            {'ACCT': '6'},                   # no key
+            {'M101': 'F006', 'ACCT': '7'},   # beyond the last master
+        ]
+        join = MA78MergeJoin()
+        joined = [(m['M101'], [l['ACCT'] for l in attached])
+                  for m, attached in join.join(MasterRecordProcessor(masters), links)]
+        self.assertEqual(joined, [('A001', ['1', '2']), ('C003', ['4']), ('E005', [])])
+        self.assertEqual([p for p, _ in join.orphan_links], [2, 6])
+        self.assertEqual([p for p, _ in join.out_of_sequence_links], [4])
+        self.assertEqual([p for p, _, _ in join.failures], [5])
+
+    def test_join_against_fixed_width_file(self):
+        layout = MM77Layout({'M100': (0, 1), 'M101': (1, 6)}, record_length=7, encoding='cp037')
+        handle, path = tempfile.mkstemp(suffix='.dat')
+        with os.fdopen(handle, 'wb') as f:
+            for line in ('DA001', 'PB002', 'DC003', 'DZ999'):
+                f.write(line.ljust(7).encode('cp037') + b'\n')
+        self.addCleanup(os.remove, path)
+        links = [{'M101': 'A001', 'ACCT': '1'}, {'M101': 'B002', 'ACCT': '2'},
+                 {'M101': 'C003', 'ACCT': '3'}, {'M101': 'C003', 'ACCT': '4'}]
+
+        with MM77FileReader(path, layout) as reader:
+            processor = MasterRecordProcessor(reader)
+            self.assertEqual(ma78_link_key(processor)(links[0]), 'A001  '.encode('cp037'))
+            join = MA78MergeJoin()
+            joined = [(m['M101'], [l['ACCT'] for l in attached])
+                      for m, attached in join.join(processor, links)]
+        self.assertEqual(joined, [('A001', ['1']), ('C003', ['3', '4'])])
+        self.assertEqual([p for p, _ in join.orphan_links], [1])
+        self.assertEqual(ma78_isort1(links[0]), 'A001      ')
+
+    def test_unkeyable_links_are_failures(self):
+        layout = MM77Layout({'M100': (0, 1), 'M101': (1, 6)}, record_length=7,
+                            isort1_fields=('M100', 'M101'))
+        links = [{'M101': 'A001'}, {'M101': 1}]
+        join = MA78MergeJoin(link_key=partial(ma78_isort1, layout=layout))
+        joined = list(join.join(MasterRecordProcessor([{'M100': 'D', 'M101': 'A001'}]), links))
+        self.assertEqual(joined, [({'M100': 'D', 'M101': 'A001'}, [])])
+        self.assertEqual([(p, messages) for p, _, messages in join.failures],
+                         [(0, ['Invalid M101: ISORT1 has 2 field(s), got 1 value(s)']),
+                          (1, ['Invalid M101: M101 must be a str, not int'])])
+
+        join = MA78MergeJoin()
+        list(join.join(MasterRecordProcessor([{'M100': 'D', 'M101': 'A001'}]), links))
+        self.assertEqual([p for p, _, _ in join.failures], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import json
+import os
+import pickle
+import random
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import get4_transaction_records as get4
+from instrumentation import registry
+
+try:
+    import requests
+except ImportError:  # Only the HTTP fetch paths need requests
+    requests = None
+
+
+class TestTransactionRecords(unittest.TestCase):
+
+    def test_transaction_record_is_slotted(self):
+        record = get4.TransactionRecord('T1', 10, '2026-02-08')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.extra = 1
+
+    def test_process_and_sort_records(self):
+        records = get4.process_records([
+            {'id': 'T2', 'amount': 20, 'date': '2026-02-08'},
+            {'id': 'T1', 'amount': 10, 'date': '2026-02-07'},
+        ])
+        self.assertEqual([r.record_id for r in get4.sort_records(records, 'amount')], ['T1', 'T2'])
+
+    def test_amounts_sort_numerically_not_lexically(self):
+        records = get4.process_records([
+            {'id': 'T1', 'amount': '100', 'date': '2026-02-08'},
+            {'id': 'T2', 'amount': '20', 'date': '2026-02-08'},
+            {'id': 'T3', 'amount': 20.005, 'date': '2026-02-08'},
+            {'id': 'T4', 'amount': '-5.5', 'date': '2026-02-08'},
+            {'id': 'T5', 'amount': 'n/a', 'date': '2026-02-08'},
+            {'id': 'T6', 'amount': '10.004', 'date': '08/02/2026'},
+            {'id': 'T7', 'amount': 10.001, 'date': '2026-02-08'},
+        ])
+        self.assertEqual(len(records), 7)
+        ordered = get4.sort_records(records, 'amount')
+        # Full precision; values that don't parse sort last
+        self.assertEqual([r.record_id for r in ordered], ['T4', 'T7', 'T6', 'T2', 'T3', 'T1', 'T5'])
+        ordered = get4.sort_records(records, 'date')
+        self.assertEqual(ordered[-1].record_id, 'T6')
+
+    def test_sort_keys_are_precomputed(self):
+        record = get4.TransactionRecord('T1', '12.34', '2026-02-08T10:00:00')
+        self.assertEqual((record.amount_key, record.date_key), (1234, 739655))
+        self.assertEqual(get4.TransactionRecord('T2', 7, '2026-02-08').amount_key, 700)
+        self.assertEqual(get4.TransactionRecord('T3', '0.001', ['x']).amount_key, get4.Decimal('0.1'))
+        self.assertIs(get4.TransactionRecord('T3', 'n/a', ['x']).date_key, get4.UNPARSEABLE_KEY)
+        restored = pickle.loads(pickle.dumps(record))
+        self.assertEqual((restored.amount_key, restored.date_key), (1234, 739655))
+
+    def test_strict_mode_drops_unparseable_records(self):
+        records = [{'id': 'T1', 'amount': '1.50', 'date': '2026-02-08'},
+                   {'id': 'T2', 'amount': 'NaN', 'date': '2026-02-08'},
+                   {'id': 'T3', 'amount': 2, 'date': '08/02/2026'}]
+        registry.reset()
+        registry.enable()
+        self.addCleanup(registry.reset)
+        self.addCleanup(registry.disable)
+        self.assertEqual([r.record_id for r in get4.process_records(records, strict=True)], ['T1'])
+        self.assertEqual(registry.counters['get4.records_invalid'], 2)
+        self.assertEqual(len(get4.process_records(records)), 3)
+
+    def test_default_multi_key_order(self):
+        records = get4.process_records([
+            {'id': 'T3', 'amount': '5', 'date': '2026-02-08'},
+            {'id': 'T1', 'amount': '5', 'date': '2026-02-08'},
+            {'id': 'T2', 'amount': '50', 'date': '2026-02-07T23:59:00'},
+            {'id': 'T4', 'amount': '4.99', 'date': '2026-02-08'},
+        ])
+        self.assertEqual([r.record_id for r in get4.sort_records(records)], ['T2', 'T4', 'T1', 'T3'])
+
+
+class TestExternalSort(unittest.TestCase):
+
+    def synthetic_transactions(self, count):
+        rng = random.Random(5)
+        return [get4.TransactionRecord(f'T{i:05d}', rng.randrange(100),
+                                       f'2026-02-{rng.randrange(1, 28):02d}')
+                for i in range(count)]
+
+    def test_matches_in_memory_sort(self):
+        records = self.synthetic_transactions(2000)
+        for key_attr in ('amount', 'date', 'record_id', ('date', 'amount')):
+            expected = get4.sort_records(records, key_attr)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                spilled = list(get4.external_sort_records(iter(records), key_attr,
+                                                          memory_budget=20_000,
+                                                          temp_dir=temp_dir))
+                self.assertEqual(os.listdir(temp_dir), [])
+            self.assertEqual(pickle.dumps(spilled), pickle.dumps(expected))
+
+    def test_fits_in_memory_without_spilling(self):
+        records = self.synthetic_transactions(10)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result = get4.external_sort_records(records, 'amount', temp_dir=temp_dir)
+            self.assertEqual(list(result), get4.sort_records(records, 'amount'))
+
+
+class TestStreamingJsonDecode(unittest.TestCase):
+
+    def test_decode_across_chunk_boundaries(self):
+        payload = [{'id': f'T{i}', 'amount': i * 1.5, 'date': '2026-02-08', 'note': 'caf\u00e9 [,]'}
+                   for i in range(50)] + [12345, True, None, 'x']
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        for size in (1, 3, 7, 64, len(data)):
+            chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(list(get4.iter_json_array(chunks)), payload)
+
+    def test_numbers_split_across_chunks(self):
+        for chunks in ([b'[12.', b'5]'], [b'[1e', b'3]'], [b'[-', b'1.5E', b'-2 ,', b'7', b']'],
+                       [b'[1', b'0', b'0]']):
+            with self.subTest(chunks=chunks):
+                self.assertEqual(list(get4.iter_json_array(chunks)),
+                                 json.loads(b''.join(chunks)))
+
+    def test_malformed_element_is_not_buffered_whole(self):
+        pulled = []
+
+        def chunks():
+            yield b'[{"id": x'
+            for _ in range(1000):
+                pulled.append(1)
+                yield b' ' * 100
+        with self.assertRaises(ValueError):
+            list(get4.iter_json_array(chunks(), max_element_size=1000))
+        self.assertLess(len(pulled), 20)
+
+    def test_empty_and_malformed_arrays(self):
+        self.assertEqual(list(get4.iter_json_array([b' [ ', b'] '])), [])
+        with self.assertRaises(ValueError):
+            list(get4.iter_json_array([b'[{"id": 1}']))
+        with self.assertRaises(ValueError):
+            list(get4.iter_json_array([b'{"id": 1}']))
+        with self.assertRaises(ValueError):
+            list(get4.iter_json_array([b'[1 2]']))
+
+    def test_stream_from_file_dump(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as f:
+            json.dump([{'id': 'T1', 'amount': 5, 'date': '2026-02-08'},
+                       {'amount': 1},
+                       {'id': 'T2', 'amount': 7, 'date': '2026-02-08'}], f)
+        transactions = get4.stream_transaction_records_from_file(path, chunk_size=16)
+        self.assertEqual([t.record_id for t in transactions], ['T1', 'T2'])
+
+
+class StubTransactionHandler(BaseHTTPRequestHandler):
+    total_records = 0
+    fail_first = set()
+    requests_seen = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        page, page_size = int(query['page'][0]), int(query['page_size'][0])
+        self.requests_seen.append(page)
+        if page in self.fail_first:
+            self.fail_first.discard(page)
+            self.send_response(503)
+            self.end_headers()
+            return
+        start = (page - 1) * page_size
+        end = min(start + page_size, self.total_records)
+        body = json.dumps([{'id': f'T{i}', 'amount': i, 'date': '2026-02-08'}
+                           for i in range(start, end)]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(requests is None, 'requests is not installed')
+class TestTransactionPageFetcher(unittest.TestCase):
+
+    def setUp(self):
+        StubTransactionHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubTransactionHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/transactions'
+
+    def test_pages_stream_in_order_with_retry(self):
+        StubTransactionHandler.total_records = 95
+        StubTransactionHandler.fail_first = {2}
+        with get4.TransactionPageFetcher(self.url, page_size=10, max_workers=3,
+                                         backoff=0.01) as fetcher:
+            pages = list(fetcher.iter_processed_pages())
+        self.assertEqual([len(page) for page in pages], [10] * 9 + [5])
+        ids = [t.record_id for page in pages for t in page]
+        self.assertEqual(ids, [f'T{i}' for i in range(95)])
+        self.assertEqual(StubTransactionHandler.requests_seen.count(2), 2)
+
+    def test_stream_http_body(self):
+        StubTransactionHandler.total_records = 30
+        StubTransactionHandler.fail_first = set()
+        transactions = get4.stream_transaction_records(f'{self.url}?page=1&page_size=100',
+                                                       chunk_size=64)
+        self.assertEqual([t.record_id for t in transactions], [f'T{i}' for i in range(30)])
+
+    def test_exhausted_retries_raise(self):
+        StubTransactionHandler.total_records = 5
+        StubTransactionHandler.fail_first = {1}
+        fetcher = get4.TransactionPageFetcher(self.url, page_size=10, max_workers=1,
+                                              max_retries=0)
+        self.addCleanup(fetcher.close)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            list(fetcher.iter_pages())
+
+
+if __name__ == '__main__':
+    unittest.main()
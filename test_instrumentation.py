@@ -0,0 +1,149 @@
+import json
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+
+import get4_transaction_records as get4
+from get1_master_record import MasterRecordProcessor
+from get2_pos_usage import get2_pos_usage
+from get3_merchant_account_links import MA78BatchProcessor, process_merchant_account_links
+from instrumentation import InstrumentationRegistry, registry
+from mm77_reader import MM77FileReader
+from test_mm77_reader import fixed_width
+
+
+class TestInstrumentationRegistry(unittest.TestCase):
+
+    def setUp(self):
+        registry.reset()
+        registry.enable()
+        self.addCleanup(registry.reset)
+        self.addCleanup(registry.disable)
+
+    def test_disabled_registry_records_nothing(self):
+        registry.disable()
+        MasterRecordProcessor([{'M100': 'D', 'M101': 'A001'}]).process_all_records()
+        get2_pos_usage([{'tid': 'T1', 'date': '2026-02-08'}])
+        process_merchant_account_links({'field1': 1, 'field2': 2, 'field3': 3})
+        self.assertEqual(registry.snapshot(),
+                         {'counters': {}, 'timers': {}, 'memory_peaks': {}, 'profiles': {}})
+
+    def test_get1_counts(self):
+        records = [
+            {'M100': 'D', 'M101': 'A001'},
+            {'M100': 'P', 'M101': 'A002'},
+            {'M100': 'D', 'M101': ''},
+            {'M100': 'D', 'M101': 'A003'},
+            {'M100': 'D', 'M101': 'Z999'},
+        ]
+        MasterRecordProcessor(records).process_all_records()
+        counters = registry.counters
+        self.assertEqual((counters['get1.records_in'], counters['get1.records_out'],
+                          counters['get1.parents_skipped'], counters['get1.missing_meid']),
+                         (5, 2, 1, 1))
+        self.assertEqual(registry.timers['get1'][0], 1)
+
+    def test_get1_bytes_read_from_mm77_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mm77.dat')
+            with open(path, 'wb') as f:
+                f.write(fixed_width('D', 'A001') + fixed_width('D', 'A002') + fixed_width('D', 'Z999'))
+            with MM77FileReader(path) as reader:
+                MasterRecordProcessor(reader).process_all_records()
+                self.assertEqual(registry.counters['get1.bytes_read'], 3 * reader.stride)
+
+    def test_get1_and_get3_scans_are_profiled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry.enable(profile_dir=directory, trace_memory=True)
+            records = [{'M100': 'D', 'M101': f'A{i:03d}'} for i in range(100)]
+            # GET3 runs between the GET1 scan's yields, as in a loop handler
+            for record in MasterRecordProcessor(records).iter_valid_records():
+                process_merchant_account_links({'field1': 1, 'field2': 2, 'field3': 3})
+            self.assertEqual(registry.timers['get3'][0], 100)
+            self.assertEqual(set(registry.profiles), {'get1', 'get3'})
+            functions = {function for _, _, function in pstats.Stats(registry.profiles['get1']).stats}
+            self.assertNotIn('process_merchant_account_links', functions)
+            self.assertTrue(all(map(os.path.exists, registry.profiles.values())))
+            self.assertIn('get1', registry.memory_peaks)
+            self.assertIn('get3', registry.memory_peaks)
+
+    def test_interleaved_stage_keeps_its_memory_peak(self):
+        registry.enable(trace_memory=True)
+        with registry.stage('outer'):
+            data = bytes(1_000_000)
+            del data
+            # Entering the inner stage must not lose the outer stage's peak
+            with registry.stage('inner'):
+                pass
+        self.assertGreater(registry.memory_peaks['outer'], 900_000)
+        self.assertLess(registry.memory_peaks['inner'], 100_000)
+
+    def test_profile_accumulates_over_stage_calls(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry.enable(profile_dir=directory)
+            for _ in range(3):
+                get4.process_records([{'id': 1, 'amount': '1.00', 'date': '2026-01-01'}], strict=True)
+            self.assertEqual(os.listdir(directory), ['get4.process.prof'])
+            stats = pstats.Stats(registry.profiles['get4.process']).stats
+            calls = [primitive for (_, _, function), (primitive, *_) in stats.items()
+                     if function == 'parse_amount']
+            self.assertEqual(calls, [3])
+
+    def test_get2_and_get3_counts(self):
+        get2_pos_usage([{'tid': 'T1', 'date': '2026-02-08'},
+                        {'tid': 'T1', 'date': '2026-02-07'},
+                        {'tid': 'T2', 'date': '2026-02-08'}])
+        self.assertEqual((registry.counters['get2.records_in'], registry.counters['get2.records_out'],
+                          registry.counters['get2.records_skipped']), (3, 2, 1))
+
+        process_merchant_account_links({'field1': 1, 'field2': 2, 'field3': 3})
+        with self.assertRaises(ValueError):
+            process_merchant_account_links({'field1': 1})
+        list(MA78BatchProcessor().process([{'field1': 1, 'field2': 2, 'field3': 3}, {}]))
+        self.assertEqual((registry.counters['get3.records_in'], registry.counters['get3.records_out'],
+                          registry.counters['get3.records_failed']), (4, 2, 2))
+        self.assertEqual(registry.timers['get3'][0], 3)
+
+    def test_get4_counts_and_bytes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'transactions.json')
+            with open(path, 'w') as f:
+                json.dump([{'id': 1, 'amount': '1.00', 'date': '2026-01-01'},
+                           {'id': 2, 'amount': 'bad', 'date': '2026-01-01'}], f)
+            records = list(get4.stream_transaction_records_from_file(path, chunk_size=8,
+                                                                   strict=True))
+            get4.sort_records(records)
+            self.assertEqual(registry.counters['get4.bytes_read'], os.path.getsize(path))
+        self.assertEqual((registry.counters['get4.records_in'], registry.counters['get4.records_out'],
+                          registry.counters['get4.records_skipped'],
+                          registry.counters['get4.records_invalid']), (2, 1, 1, 1))
+        self.assertIn('get4.sort', registry.timers)
+
+    def test_profile_and_memory_hooks_and_dump(self):
+        local = InstrumentationRegistry()
+        self.addCleanup(local.disable)
+        with tempfile.TemporaryDirectory() as directory:
+            local.enable(profile_dir=os.path.join(directory, 'profiles'), trace_memory=True)
+            with local.stage('outer'):
+                with local.stage('inner'):
+                    data = [bytes(1000) for _ in range(100)]
+            del data
+            # Each stage profiles into its own file, the inner one included
+            self.assertEqual(sorted(local.profiles), ['inner', 'outer'])
+            self.assertTrue(all(map(os.path.exists, local.profiles.values())))
+            self.assertGreater(local.memory_peaks['inner'], 100_000)
+
+            path = os.path.join(directory, 'metrics.json')
+            local.dump_json(path)
+            with open(path) as f:
+                dumped = json.load(f)
+        self.assertEqual(dumped['timers']['outer']['calls'], 1)
+        self.assertEqual(set(dumped), {'counters', 'timers', 'memory_peaks', 'profiles'})
+        local.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
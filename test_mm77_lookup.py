@@ -0,0 +1,130 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from a2_advance_routine_new_me import BeelineAdvanceRoutine
+from get1_master_record import MasterRecordException
+from get3_merchant_account_links import lookup_link_masters
+from mm77_lookup import (
+    STORE_MAGIC, MM77LookupStore, build_lookup_store, open_lookup_store, source_fingerprint,
+)
+from test_mm77_reader import fixed_width
+
+
+class TestMM77LookupStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.mm77_path = os.path.join(directory.name, 'mm77.dat')
+        self.store_path = os.path.join(directory.name, 'mm77.lkp')
+        self.write_mm77([
+            fixed_width('D', 'C003', 'Merchant C'),
+            fixed_width('P', 'B002', 'Parent B'),
+            fixed_width('D', 'A001', 'Merchant A', 'B002'),
+            fixed_width('D', '', 'No MEID'),
+            fixed_width('D', 'A001', 'Duplicate A'),
+            fixed_width('D', 'Z999', 'EOF Marker'),
+            fixed_width('D', 'D004', 'After EOF'),
+        ])
+
+    def write_mm77(self, lines, mtime_ns=None):
+        with open(self.mm77_path, 'wb') as f:
+            f.write(b''.join(lines))
+        if mtime_ns is not None:
+            os.utime(self.mm77_path, ns=(mtime_ns, mtime_ns))
+
+    def test_lookup_by_meid(self):
+        with self.assertLogs('mm77_lookup', 'WARNING'):
+            count = build_lookup_store(self.mm77_path, self.store_path)
+        self.assertEqual(count, 3)
+        with MM77LookupStore(self.store_path) as store:
+            self.assertEqual(store['A001'].to_dict(),
+                             {'M100': 'D', 'M101': 'A001', 'NAME': 'Merchant A', 'M102': 'B002'})
+            self.assertEqual(store.get('B002').get('M100'), 'P')
+            self.assertIsNone(store.get('D004'))
+            self.assertNotIn('A00', store)
+            with self.assertRaises(KeyError):
+                store['Z999']
+            self.assertEqual([r.get('M101') for r in store], ['A001', 'B002', 'C003'])
+
+    def test_sorted_extract_is_streamed(self):
+        self.write_mm77([fixed_width('D', f'A{i:03d}', f'Merchant {i}') for i in range(50)]
+                        + [fixed_width('D', 'A049', 'Duplicate'), fixed_width('D', 'Z999')])
+        with self.assertLogs('mm77_lookup', 'INFO') as logs:
+            self.assertEqual(build_lookup_store(self.mm77_path, self.store_path, run_bytes=1), 50)
+        self.assertFalse(any('sorting externally' in line for line in logs.output))
+        with MM77LookupStore(self.store_path) as store:
+            self.assertEqual(store['A049'].get('NAME'), 'Merchant 49')
+
+    def test_unsorted_extract_is_merged_from_runs(self):
+        meids = [f'A{(i * 37) % 101:03d}' for i in range(101)]
+        self.write_mm77([fixed_width('D', meid, f'First {meid}') for meid in meids]
+                        + [fixed_width('D', meid, f'Second {meid}') for meid in meids[::3]])
+        with self.assertLogs('mm77_lookup', 'WARNING') as logs:
+            # Runs of ~5 rows: many runs, with duplicates in different runs
+            count = build_lookup_store(self.mm77_path, self.store_path, run_bytes=250)
+        self.assertTrue(any('sorting externally' in line for line in logs.output))
+        self.assertEqual(count, 101)
+        with MM77LookupStore(self.store_path) as store:
+            self.assertEqual([r.get('M101') for r in store], sorted(meids))
+            self.assertTrue(all(r.get('NAME').startswith('First') for r in store))
+
+    def test_reused_while_fresh_and_rebuilt_when_stale(self):
+        self.write_mm77([fixed_width('D', 'A001', 'Merchant A')], mtime_ns=1_000_000_000)
+        open_lookup_store(self.mm77_path, self.store_path).close()
+        # A rebuild replaces the file, so the inode identifies the build
+        built = os.stat(self.store_path).st_ino
+
+        # Touched but unchanged extract: the hash matches, the store is reused
+        # and records the new mtime, so the next open does not hash again
+        os.utime(self.mm77_path, ns=(2_000_000_000, 2_000_000_000))
+        with open_lookup_store(self.mm77_path, self.store_path) as store:
+            self.assertIn('A001', store)
+        self.assertEqual(os.stat(self.store_path).st_ino, built)
+        with mock.patch('mm77_lookup.source_fingerprint', wraps=source_fingerprint) as fingerprint:
+            with open_lookup_store(self.mm77_path, self.store_path) as store:
+                self.assertEqual(store.header['source']['mtime_ns'], 2_000_000_000)
+        self.assertEqual(fingerprint.call_args_list, [mock.call(self.mm77_path, with_hash=False)])
+
+        # Same size, new content and mtime: rebuilt
+        self.write_mm77([fixed_width('D', 'A002', 'Merchant A')], mtime_ns=3_000_000_000)
+        with open_lookup_store(self.mm77_path, self.store_path) as store:
+            self.assertNotIn('A001', store)
+            self.assertIn('A002', store)
+
+    def test_corrupt_store_is_rebuilt(self):
+        with open(self.store_path, 'wb') as f:
+            f.write(b'not a store')
+        with self.assertRaises(MasterRecordException):
+            MM77LookupStore(self.store_path)
+        with open_lookup_store(self.mm77_path, self.store_path) as store:
+            self.assertEqual(len(store), 3)
+
+    def test_malformed_header_is_rebuilt(self):
+        for header in (b'{}', b'[1, 2]', b'{"fields": {"M101": [0]}, "record_length": 1}'):
+            with self.subTest(header=header):
+                with open(self.store_path, 'wb') as f:
+                    f.write(STORE_MAGIC + struct.pack('>I', len(header)) + header)
+                with self.assertRaises(MasterRecordException):
+                    MM77LookupStore(self.store_path)
+                with self.assertLogs('mm77_lookup', 'WARNING'):
+                    store = open_lookup_store(self.mm77_path, self.store_path)
+                with store:
+                    self.assertEqual(len(store), 3)
+
+    def test_shared_by_get3_and_advance_routine(self):
+        with open_lookup_store(self.mm77_path, self.store_path) as store:
+            links = [{'M101': 'C003', 'field1': 'x'}, {'M101': 'X999'}, {'field1': 'y'}]
+            masters = [master and master.get('NAME') for _, master in lookup_link_masters(links, store)]
+            self.assertEqual(masters, ['Merchant C', None, None])
+
+            routine = BeelineAdvanceRoutine(mm77_lookup=store)
+            self.assertEqual(routine.merchant_master('B002')['NAME'], 'Parent B')
+            self.assertIsNone(routine.merchant_master('X999'))
+
+
+if __name__ == '__main__':
+    unittest.main()
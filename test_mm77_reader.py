@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from get1_master_record import MasterRecordException, MasterRecordProcessor, SequenceError
+from mm77_reader import DEFAULT_MM77_LAYOUT, MM77FileReader, MM77Layout, MM77RecordView
+
+
+def fixed_width(m100, m101, name='', m102=''):
+    return f"{m100:1}{m101:10}{name:30}{m102:10}\n".encode('ascii')
+
+
+class TestMM77FileReader(unittest.TestCase):
+
+    def write_file(self, lines):
+        handle, path = tempfile.mkstemp(suffix='.dat')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(b''.join(lines))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_views_feed_processor(self):
+        path = self.write_file([
+            fixed_width('D', 'A001', 'Merchant A'),
+            fixed_width('P', 'B002', 'Parent B'),
+            fixed_width('D', 'C003', 'Merchant C'),
+            fixed_width('D', 'Z999', 'EOF Marker'),
+        ])
+        with MM77FileReader(path) as reader:
+            processor = MasterRecordProcessor(reader)
+            records = [r.to_dict() for r in processor.iter_valid_records()]
+            self.assertEqual(processor.psort1, b'\xff' * 10)
+        self.assertEqual([r['M101'] for r in records], ['A001', 'C003'])
+        self.assertEqual(records[0]['NAME'], 'Merchant A')
+
+    def test_rows_classified_without_decoding(self):
+        path = self.write_file([
+            fixed_width('D', ''),
+            fixed_width('D', 'A001'),
+            fixed_width('P', 'B002'),
+            fixed_width('D', 'C003'),
+            fixed_width('D', 'Z999'),
+        ])
+        with MM77FileReader(path) as reader:
+            processor = MasterRecordProcessor(reader)
+            with mock.patch.object(MM77RecordView, 'get', side_effect=AssertionError):
+                records = processor.process_all_records()
+        self.assertEqual(len(records), 2)
+        self.assertEqual(processor.missing_meid, 1)
+        self.assertEqual(processor.parents_skipped, 1)
+        self.assertTrue(processor.eof_reached)
+
+    def test_isort1_is_raw_slice(self):
+        path = self.write_file([fixed_width('D', 'A001')])
+        with MM77FileReader(path) as reader:
+            view = next(iter(reader))
+            self.assertEqual(view.isort1_key(), b'A001      ')
+            self.assertEqual(view.get('M101'), 'A001')
+            self.assertIsNone(view.get('MISSING'))
+
+    def test_out_of_sequence_file(self):
+        path = self.write_file([fixed_width('D', 'B002'), fixed_width('D', 'A001')])
+        with MM77FileReader(path) as reader:
+            with self.assertRaises(SequenceError):
+                MasterRecordProcessor(reader).process_all_records()
+
+    def test_truncated_and_empty_files(self):
+        path = self.write_file([fixed_width('D', 'A001'), b'D12'])
+        with MM77FileReader(path) as reader:
+            with self.assertRaises(MasterRecordException):
+                list(reader)
+        with MM77FileReader(self.write_file([])) as reader:
+            self.assertEqual(list(reader), [])
+
+    def test_layout_validation(self):
+        with self.assertRaises(ValueError):
+            MM77Layout({'M101': (5, 10)}, record_length=10)
+        with self.assertRaises(ValueError):
+            MM77Layout({'M100': (0, 1)}, record_length=10)
+        self.assertEqual(DEFAULT_MM77_LAYOUT.isort1_fields, ('M101',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.generators import generate_ma78, generate_mm77, generate_pos, generate_transactions
+from get1_master_record import MasterRecordProcessor, SequenceError
+from get2_pos_usage import get2_pos_usage
+from get3_merchant_account_links import MA78BatchProcessor, MA78MergeJoin
+from mm77_reader import MM77FileReader, MM77Layout
+from pipeline_runner import run_pipeline
+
+
+class FakePageFetcher:
+    """GET4 page source serving a fixed list of transactions, optionally slowly."""
+
+    def __init__(self, transactions, page_size, delay=0.0):
+        self.transactions = transactions
+        self.page_size = page_size
+        self.delay = delay
+
+    def fetch_page(self, page):
+        time.sleep(self.delay)
+        start = (page - 1) * self.page_size
+        return self.transactions[start:start + self.page_size]
+
+
+class TestPipelineRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.mm77 = generate_mm77(300)
+        self.ma78 = generate_ma78(400)
+        self.pos = generate_pos(500, merchants=50)
+        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(self.executor.shutdown)
+
+    def serial_links(self):
+        join = MA78MergeJoin()
+        mapper = MA78BatchProcessor()
+        linked = [(master, list(mapper.process(links)))
+                  for master, links in join.join(MasterRecordProcessor(self.mm77), self.ma78)]
+        return linked, len(join.orphan_links)
+
+    def test_matches_serial_steps(self):
+        result = run_pipeline(self.mm77, self.ma78, self.pos, executor=self.executor,
+                              workers=3, batch_size=7, queue_size=2)
+        linked, orphans = self.serial_links()
+        self.assertEqual(result.linked, linked)
+        self.assertEqual(result.orphan_links, orphans)
+        self.assertEqual(result.link_failures, [])
+        self.assertEqual(result.pos_usage.tid_usage, get2_pos_usage(self.pos))
+        self.assertIsNone(result.transactions)
+
+    def test_link_failures_and_trailing_orphans(self):
+        links = [{'field1': 'x'}, {'M101': self.mm77[0]['M101'], 'field1': 'y'},
+                 {'M101': 'Y000000000', 'field1': 1, 'field2': 2, 'field3': 3}]
+        result = run_pipeline(self.mm77, links, executor=self.executor, batch_size=50)
+        messages = [messages for _, messages in result.link_failures]
+        self.assertEqual(messages, [['Missing required field: M101'],
+                                    ['Missing required field: field2',
+                                     'Missing required field: field3']])
+        self.assertEqual(result.orphan_links, 1)
+
+    def test_get4_pages_in_order(self):
+        transactions = generate_transactions(95)
+        fetcher = FakePageFetcher(transactions, page_size=10)
+        result = run_pipeline(self.mm77, fetcher=fetcher, executor=self.executor,
+                              fetch_concurrency=3)
+        self.assertEqual([t.record_id for t in result.transactions],
+                         [t['id'] for t in transactions])
+
+    def test_sinks_receive_output_in_order(self):
+        transactions = generate_transactions(95)
+        linked, pages = [], []
+        result = run_pipeline(self.mm77, self.ma78, fetcher=FakePageFetcher(transactions, 10),
+                              executor=self.executor, batch_size=7,
+                              on_linked=lambda master, links: linked.append((master, links)),
+                              on_transactions=pages.append)
+        self.assertIsNone(result.linked)
+        self.assertIsNone(result.transactions)
+        self.assertEqual(linked, self.serial_links()[0])
+        self.assertEqual(result.linked_count, len(linked))
+        self.assertEqual([len(page) for page in pages], [10] * 9 + [5])
+        self.assertEqual([t.record_id for page in pages for t in page],
+                         [t['id'] for t in transactions])
+        self.assertEqual(result.transaction_count, 95)
+
+    def test_stages_overlap(self):
+        # GET2 waits for a GET4 page and GET4 waits for GET2 to have started:
+        # run one after the other, either stage times out waiting for the other
+        pos_started, page_fetched = threading.Event(), threading.Event()
+
+        def pos_records():
+            yield from self.pos[:10]
+            pos_started.set()
+            if not page_fetched.wait(10):
+                raise AssertionError('GET4 did not run alongside GET2')
+            yield from self.pos[10:20]
+
+        class GatedFetcher(FakePageFetcher):
+            def fetch_page(self, page):
+                if not pos_started.wait(10):
+                    raise AssertionError('GET2 did not run alongside GET4')
+                records = super().fetch_page(page)
+                page_fetched.set()
+                return records
+
+        transactions = generate_transactions(25)
+        result = run_pipeline(self.mm77, pos_records=pos_records(),
+                              fetcher=GatedFetcher(transactions, page_size=10),
+                              executor=self.executor, batch_size=10, fetch_concurrency=1)
+        self.assertEqual(result.pos_usage.tid_usage, get2_pos_usage(self.pos[:20]))
+        self.assertEqual(result.transaction_count, 25)
+
+    def test_fixed_width_keys_and_out_of_sequence_links(self):
+        layout = MM77Layout({'M100': (0, 1), 'M101': (1, 6)}, record_length=7, encoding='cp037')
+        handle, path = tempfile.mkstemp(suffix='.dat')
+        with os.fdopen(handle, 'wb') as f:
+            for line in ('DA001', 'DB002', 'DC003', 'DZ999'):
+                f.write(line.ljust(7).encode('cp037') + b'\n')
+        self.addCleanup(os.remove, path)
+        links = [{'M101': 'A001', 'field1': 1, 'field2': 2, 'field3': 3},
+                 {'M101': 'C003', 'field1': 1, 'field2': 2, 'field3': 3},
+                 {'M101': 'B002', 'field1': 1, 'field2': 2, 'field3': 3},
+                 {'M101': 7},
+                 {'M101': 'C003', 'field1': 4, 'field2': 5, 'field3': 6}]
+
+        with MM77FileReader(path, layout) as reader:
+            join, mapper = MA78MergeJoin(), MA78BatchProcessor()
+            serial = [(master.to_dict(), list(mapper.process(attached)))
+                      for master, attached in join.join(MasterRecordProcessor(reader), links)]
+            result = run_pipeline(reader, links, executor=self.executor, batch_size=2)
+        self.assertEqual(result.linked, serial)
+        self.assertEqual([len(attached) for _, attached in result.linked], [1, 0, 2])
+        self.assertEqual(result.out_of_sequence_links, len(join.out_of_sequence_links))
+        self.assertEqual(result.out_of_sequence_links, 1)
+        self.assertEqual(result.orphan_links, len(join.orphan_links))
+        self.assertEqual([messages for _, messages in result.link_failures],
+                         [messages for _, _, messages in join.failures + mapper.failures])
+
+    def test_sequence_error_stops_pipeline(self):
+        mm77 = [{'M100': 'D', 'M101': 'B002'}, {'M100': 'D', 'M101': 'A001'}]
+        with self.assertRaises(SequenceError):
+            run_pipeline(mm77, self.ma78, self.pos, executor=self.executor)
+
+    def test_process_pool(self):
+        result = run_pipeline(self.mm77, self.ma78, self.pos, workers=2, batch_size=100)
+        self.assertEqual(result.linked, self.serial_links()[0])
+        self.assertEqual(result.pos_usage.tid_usage, get2_pos_usage(self.pos))
+
+
+if __name__ == '__main__':
+    unittest.main()